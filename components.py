@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+
+# Date: 2026-10-18
+# Author: agent <agent@local>
+# Description: Parallel connected components of edge files larger than
+# memory with union_find.py.
+#
+# components.py reads an edge list stored as a .npy file (m x 2 integers)
+# or as raw int64 pairs through a memory map. A process pool turns every
+# chunk of edges into a partial forest: the nodes of the chunk are
+# renumbered, joined with UnionFind.union_many and written as (node, root)
+# pairs of the non-root nodes. The forests are merged pairwise in a
+# reduction tree (the merges of a level run in parallel), since the pairs
+# of two forests are themselves edges with the same components. The final
+# forest is written into a memory-mapped output of one int64 component id
+# per node: the smallest node of its component.
+#
+# Memory per worker is bounded by the chunk size in the first phase and
+# by the nodes of the merged forests (at most the number of nodes) in the
+# reduction.
+#
+
+#####
+import sys
+import os
+import time
+import shutil
+import tempfile
+import multiprocessing
+import numpy
+import union_find
+
+### edges of a .npy or raw int64 file as a read-only memory map ###
+def openEdges(fn) :
+    edges = union_find.openArray(fn, numpy.int64, (-1, 2))
+    if (edges.ndim != 2 or edges.shape[1] != 2) :
+        raise ValueError('invalid edge file shape: ' + str(edges.shape))
+    return edges
+
+### (node, root) pairs of the non-root nodes of the forest of the edges; ###
+### the root is the smallest node of the component ###
+def getForest(src, dst) :
+    [nodes, inverse] = numpy.unique(numpy.concatenate([src, dst]), \
+        return_inverse=True)
+    uf = union_find.UnionFind(len(nodes))
+    parent = uf.union_many(inverse[:len(src)], inverse[len(src):])
+    keep = (parent != numpy.arange(len(nodes)))
+    return [nodes[keep], nodes[parent[keep]]]
+
+### forest of the edges [start, stop) of the edge file ###
+def forestChunk(task) :
+    [fn, start, stop, prefix] = task
+    edges = numpy.asarray(openEdges(fn)[start:stop], dtype=numpy.int64)
+    [nodes, roots] = getForest(edges[:, 0], edges[:, 1])
+    numpy.save(prefix + '.nodes.npy', nodes)
+    numpy.save(prefix + '.roots.npy', roots)
+    top = -1
+    if (len(edges) > 0) :
+        top = int(edges.max())
+        if (edges.min() < 0) :
+            raise ValueError('negative node id in ' + fn)
+    return top
+
+### merge the forests of two prefixes into a new prefix ###
+def mergeForests(task) :
+    [first, second, prefix] = task
+    src = []
+    dst = []
+    for p in [first, second] :
+        src.append(numpy.load(p + '.nodes.npy'))
+        dst.append(numpy.load(p + '.roots.npy'))
+        os.unlink(p + '.nodes.npy')
+        os.unlink(p + '.roots.npy')
+    [nodes, roots] = getForest(numpy.concatenate(src), numpy.concatenate(dst))
+    numpy.save(prefix + '.nodes.npy', nodes)
+    numpy.save(prefix + '.roots.npy', roots)
+    return prefix
+
+### component ids of the nodes into the file out; returns the number of ###
+### components ###
+def connectedComponents(fn, out, n=None, workers=None, chunk=4194304, \
+        block=1048576) :
+    m = len(openEdges(fn))
+    tmp = tempfile.mkdtemp(prefix='components.', \
+        dir=os.path.dirname(os.path.abspath(out)))
+    try :
+        pool = multiprocessing.Pool(workers)
+
+        # partial forests per chunk
+        tasks = []
+        for start in range(0, max(m, 1), chunk) :
+            prefix = os.path.join(tmp, 'f0.%09d' % start)
+            tasks.append([fn, start, min(m, start + chunk), prefix])
+        top = max(pool.map(forestChunk, tasks, 1))
+        if (n is None) :
+            n = top + 1
+        elif (top >= n) :
+            raise ValueError('node id out of range: ' + str(top))
+
+        # reduction tree
+        prefixes = [task[3] for task in tasks]
+        level = 0
+        while (len(prefixes) > 1) :
+            level += 1
+            merges = []
+            for p in range(0, len(prefixes) - 1, 2) :
+                prefix = os.path.join(tmp, 'f%d.%09d' % (level, p))
+                merges.append([prefixes[p], prefixes[p + 1], prefix])
+            rest = prefixes[len(merges) * 2:]
+            prefixes = pool.map(mergeForests, merges, 1) + rest
+        pool.close()
+        pool.join()
+
+        # no nodes: empty output
+        if (n == 0) :
+            open(out, 'wb').close()
+            return 0
+
+        # component ids: the node itself unless it is in the forest
+        ids = numpy.memmap(out, dtype=numpy.int64, mode='w+', shape=(n,))
+        for start in range(0, n, block) :
+            ids[start:start+block] = numpy.arange(start, min(n, start + block))
+        nodes = numpy.load(prefixes[0] + '.nodes.npy', mmap_mode='r')
+        roots = numpy.load(prefixes[0] + '.roots.npy', mmap_mode='r')
+        for start in range(0, len(nodes), block) :
+            ids[nodes[start:start+block]] = roots[start:start+block]
+        ids.flush()
+        del ids
+        return n - len(nodes)
+    finally :
+        shutil.rmtree(tmp)
+
+### main ###
+if __name__ == '__main__':
+
+    # check args
+    args = sys.argv[1:]
+    nargs = len(args)
+    if (nargs < 2) :
+        print '# usage: components.py edge_file out_file [workers] [chunk] ' + \
+            '[nodes]'
+        sys.exit()
+
+    # read input parameters
+    fn = args[0]
+    out = args[1]
+    workers = None
+    if (nargs > 2) :
+        workers = int(args[2])
+    chunk = 4194304
+    if (nargs > 3) :
+        chunk = int(args[3])
+    n = None
+    if (nargs > 4) :
+        n = int(args[4])
+
+    # components
+    start = time.time()
+    count = connectedComponents(fn, out, n, workers, chunk)
+    print '# edges = ', len(openEdges(fn)), '; components = ', count, \
+        '; time = ', (time.time() - start), 's'
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+
+# Date: 2026-10-18
+# Author: agent <agent@local>
+# Description: Graph loader for toposort.py and maxpath.py.
+#
+# graph_loader.py reads the tab-separated node and edge files of
+# toposort.py (see the sample there) in one streaming pass: node names
+# are interned into integer ids (in file order) with a dict, and the
+# edges NodeTo <tab> NodeFrom are collected as id arrays and compiled
+# into CSR adjacency in both directions. Self-references and duplicate
+# edges are dropped. The compiled graph can be cached in a binary .npz
+# file, keyed by the size and modification time of the input files, so
+# that repeated runs on unchanged inputs skip the parsing.
+#
+
+#####
+import sys
+import os
+import time
+import array
+import numpy
+
+### compiled graph ###
+class Graph :
+    ### constructor ###
+    def __init__(self, names, efrom, eto, dependents=None, references=None) :
+        self.names = names # id -> name
+        self.ids = dict(zip(names, xrange(len(names))))
+        self.size = len(names)
+        self.efrom = efrom # efrom[e] references eto[e]
+        self.eto = eto
+        # nodes referencing n: dependents[1][dependents[0][n]:...[n+1]]
+        if (dependents is None) :
+            dependents = getCsr(self.size, eto, efrom)
+        self.dependents = dependents
+        # nodes referenced by n
+        if (references is None) :
+            references = getCsr(self.size, efrom, eto)
+        self.references = references
+        self.indeg = numpy.diff(references[0])
+
+    ### info ###
+    def printInfo(self) :
+        print '-- number of nodes =', self.size
+        print '-- number of edges =', len(self.efrom)
+
+### CSR lists of the tails per head: indices[indptr[n]:indptr[n+1]] ###
+### (ascending) are the tails of the edges with head n ###
+def getCsr(size, heads, tails) :
+    order = numpy.lexsort((tails, heads))
+    indptr = numpy.zeros(size + 1, dtype=numpy.int64)
+    numpy.cumsum(numpy.bincount(heads, minlength=size), out=indptr[1:])
+    return [indptr, tails[order]]
+
+### parse the node and edge files ###
+def parseGraph(nodeFile, edgeFile) :
+    ids = {}
+    names = []
+    f = open(nodeFile, 'r')
+    for line in f :
+        if (not line.startswith('#')) :
+            name = line.strip()
+            if (name not in ids) :
+                ids[name] = len(names)
+                names.append(name)
+    f.close()
+
+    # edges NodeTo <tab> NodeFrom
+    efrom = array.array('l')
+    eto = array.array('l')
+    f = open(edgeFile, 'r')
+    for line in f :
+        if (not line.startswith('#')) :
+            edge = line.strip().split('\t')
+            # exclude self-references
+            if (len(edge) > 1 and not edge[0] == edge[1]) :
+                try :
+                    efrom.append(ids[edge[1]])
+                    eto.append(ids[edge[0]])
+                except KeyError, e :
+                    f.close()
+                    raise ValueError('edge node not in ' + nodeFile + ': ' + \
+                        str(e))
+    f.close()
+
+    # unique edges
+    size = max(len(names), 1)
+    codes = numpy.frombuffer(efrom, dtype=numpy.int_).astype(numpy.int64) * \
+        size + numpy.frombuffer(eto, dtype=numpy.int_)
+    codes = numpy.unique(codes)
+    return Graph(names, codes // size, codes % size)
+
+### cache key of the input files: size and modification time of each ###
+def getCacheKey(files) :
+    key = []
+    for fn in files :
+        st = os.stat(fn)
+        key += [float(st.st_size), float(st.st_mtime)]
+    return numpy.array(key)
+
+### graph of the node and edge files; cached in cache (if given) ###
+def loadGraph(nodeFile, edgeFile, cache=None) :
+    key = getCacheKey([nodeFile, edgeFile])
+    if (cache is not None and os.path.exists(cache)) :
+        data = numpy.load(cache)
+        try :
+            if (numpy.array_equal(data['key'], key)) :
+                names = data['names'].tolist()
+                return Graph(names, data['efrom'], data['eto'], \
+                    [data['dindptr'], data['dindices']], \
+                    [data['rindptr'], data['rindices']])
+        finally :
+            data.close()
+    graph = parseGraph(nodeFile, edgeFile)
+    if (cache is not None) :
+        tmp = cache + '.tmp'
+        f = open(tmp, 'wb')
+        numpy.savez(f, key=key, names=numpy.array(graph.names, dtype=str), \
+            efrom=graph.efrom, eto=graph.eto, \
+            dindptr=graph.dependents[0], dindices=graph.dependents[1], \
+            rindptr=graph.references[0], rindices=graph.references[1])
+        f.close()
+        os.rename(tmp, cache)
+    return graph
+
+### main ###
+if __name__ == '__main__':
+
+    # check args
+    args = sys.argv[1:]
+    nargs = len(args)
+    if (nargs < 2) :
+        print '-- usage: graph_loader.py node_file_name edge_file_name ' + \
+            '[cache_file_name]'
+        sys.exit()
+
+    # load
+    cache = None
+    if (nargs > 2) :
+        cache = args[2]
+    start = time.time()
+    graph = loadGraph(args[0], args[1], cache)
+    graph.printInfo()
+    print '-- load time =', int(round((time.time() - start) * 1000)), 'ms.'
@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+
+# Date: 2026-10-18
+# Author: agent <agent@local>
+# Description: Hoshen-Kopelman cluster labelling of 2D/3D occupancy grids
+# (Ref. [1]) with union_find.py.
+#
+# hoshen_kopelman.py labels the clusters of occupied cells (face
+# neighbours) of a boolean grid one layer (row of a 2D grid, plane of a
+# 3D grid) at a time. Only the labels of the previous layer are kept: the
+# cells of the current layer and the labels of the previous layer they
+# touch are joined with one vectorized union_many call, clusters that
+# meet the previous layer take its smallest label and the other labels
+# they touch are recorded as equivalent to it. The provisional labels
+# are written to the output as the scan goes, and a second pass over the
+# output replaces them with the final cluster numbers 1, 2, ... (0 for
+# empty cells) in the order the clusters are first met. The grid may be
+# a numpy array or a memory-mapped file; so may the output.
+#
+# References:
+#
+# 1. J. Hoshen and R. Kopelman, Phys. Rev. B 14, 3438 (1976)
+#
+
+#####
+import sys
+import time
+import numpy
+import union_find
+import percolation
+
+### grid of a .npy or raw uint8/bool file as a read-only memory map ###
+def openGrid(fn, shape=None) :
+    return union_find.openArray(fn, numpy.bool_, shape)
+
+### neighbour pairs of the occupied cells within one layer; bonds are ###
+### the lattice bonds of the layer shape (percolation.latticeBonds) ###
+def getLayerEdges(occupied, bonds) :
+    [src, dst] = bonds
+    occupied = occupied.ravel()
+    both = occupied[src] & occupied[dst]
+    return [src[both], dst[both]]
+
+### label the clusters of grid (2D or 3D) layer by layer along axis 0 ###
+### returns the labels (out if given) and the cluster sizes; cluster c ###
+### has sizes[c - 1] cells ###
+def labelGrid(grid, out=None, capacity=1024) :
+    shape = grid.shape
+    if (len(shape) not in [2, 3]) :
+        raise ValueError('grid must be 2D or 3D: ' + str(shape))
+    dtype = numpy.int32
+    if (numpy.prod(shape) >= 2**31) :
+        dtype = numpy.int64
+    if (out is None) :
+        out = numpy.zeros(shape, dtype=dtype)
+    elif (out.shape != shape) :
+        raise ValueError('output shape differs: ' + str(out.shape))
+
+    # provisional labels: parent (equivalences) and size; 0 is empty
+    parent = numpy.zeros(capacity, dtype=numpy.int64)
+    sizes = numpy.zeros(capacity, dtype=numpy.int64)
+    count = 1
+    cells = int(numpy.prod(shape[1:]))
+    prev = numpy.zeros(cells, dtype=numpy.int64)
+    bonds = percolation.latticeBonds(shape[1:])
+
+    # first pass: one layer at a time
+    for z in range(shape[0]) :
+        occupied = numpy.asarray(grid[z], dtype=numpy.bool_)
+        [src, dst] = getLayerEdges(occupied, bonds)
+        occupied = occupied.ravel()
+
+        # labels of the previous layer touched, as extra nodes after cells
+        touch = occupied & (prev > 0)
+        [glabels, inverse] = numpy.unique(prev[touch], return_inverse=True)
+        src = numpy.concatenate([src, numpy.flatnonzero(touch)])
+        dst = numpy.concatenate([dst, cells + inverse])
+        uf = union_find.UnionFind(cells + len(glabels))
+        comp = uf.union_many(src, dst)
+
+        # components meeting the previous layer take its smallest label
+        big = numpy.iinfo(numpy.int64).max
+        rep = numpy.empty(cells + len(glabels), dtype=numpy.int64)
+        rep.fill(big)
+        gcomp = comp[cells:]
+        [groots, first] = numpy.unique(gcomp, return_index=True)
+        rep[groots] = glabels[first] # glabels ascending
+        merged = (glabels != rep[gcomp])
+        [targets, inverse] = numpy.unique(rep[gcomp[merged]], \
+            return_inverse=True)
+        sizes[targets] += numpy.bincount(inverse, \
+            weights=sizes[glabels[merged]]).astype(numpy.int64)
+        parent[glabels[merged]] = rep[gcomp[merged]]
+
+        # new labels for the other components, in scan order
+        idx = numpy.flatnonzero(occupied)
+        ccomp = comp[idx]
+        roots = numpy.unique(ccomp)
+        new = roots[rep[roots] == big]
+        if (count + len(new) > len(parent)) :
+            size = len(parent)
+            while (size < count + len(new)) :
+                size *= 2
+            parent = numpy.concatenate([parent, \
+                numpy.zeros(size - len(parent), dtype=numpy.int64)])
+            sizes = numpy.concatenate([sizes, \
+                numpy.zeros(size - len(sizes), dtype=numpy.int64)])
+        rep[new] = numpy.arange(count, count + len(new))
+        parent[count:count+len(new)] = numpy.arange(count, count + len(new))
+        count += len(new)
+
+        # labels of the layer
+        prev = numpy.zeros(cells, dtype=numpy.int64)
+        prev[idx] = rep[ccomp]
+        [layer, counts] = numpy.unique(prev[idx], return_counts=True)
+        sizes[layer] += counts
+        out[z] = prev.reshape(shape[1:])
+
+    # final cluster numbers: roots in order of their provisional label
+    parent = union_find.compress(parent[:count])
+    roots = numpy.flatnonzero(parent == numpy.arange(count))[1:]
+    final = numpy.zeros(count, dtype=dtype)
+    final[roots] = numpy.arange(1, len(roots) + 1)
+    final = final[parent]
+
+    # second pass over the output
+    for z in range(shape[0]) :
+        out[z] = final[out[z]]
+    return [out, sizes[roots]]
+
+### cluster count, largest, mean and weighted mean size ###
+def clusterStatistics(sizes) :
+    sizes = numpy.asarray(sizes, dtype=numpy.float)
+    if (len(sizes) == 0) :
+        return {'clusters' : 0, 'cells' : 0, 'largest' : 0, 'mean' : 0.0, \
+            'weighted_mean' : 0.0}
+    return {'clusters' : len(sizes), 'cells' : int(sizes.sum()), \
+        'largest' : int(sizes.max()), 'mean' : sizes.mean(), \
+        'weighted_mean' : (sizes * sizes).sum() / sizes.sum()}
+
+### main ###
+if __name__ == '__main__':
+
+    # check args
+    args = sys.argv[1:]
+    nargs = len(args)
+    if (nargs < 1) :
+        print '# usage: hoshen_kopelman.py grid_file [shape] [label_file]'
+        print '#        hoshen_kopelman.py size[xsize...] [occupancy]'
+        sys.exit()
+
+    # random grid (e.g. 4096x4096) or grid file (.npy or raw bytes)
+    try :
+        shape = [int(x) for x in args[0].split('x')]
+    except ValueError :
+        shape = None
+    out = None
+    if (shape is not None) :
+        p = 0.5
+        if (nargs > 1) :
+            p = float(args[1])
+        grid = numpy.random.RandomState(1).random_sample(shape) < p
+    else :
+        if (nargs > 1) :
+            shape = [int(x) for x in args[1].split('x')]
+        grid = openGrid(args[0], shape)
+        if (nargs > 2) :
+            out = numpy.memmap(args[2], dtype=numpy.int32, mode='w+', \
+                shape=grid.shape)
+
+    # label
+    start = time.time()
+    [labels, sizes] = labelGrid(grid, out)
+    stats = clusterStatistics(sizes)
+    print '# shape = ', grid.shape, '; clusters = ', stats['clusters'], \
+        '; largest = ', stats['largest'], '; mean = ', stats['mean'], \
+        '; time = ', (time.time() - start), 's'
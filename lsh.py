@@ -9,41 +9,75 @@
 # main method also enables testing the algorithm by generating random
 # coordinates and computing the locality sensitive hashes and printing
 # out the pairs which are close to each other (based on the hash value).
+# MinHash (Ref. [2]) and SimHash (Ref. [3]) hash token sets and sparse
+# vectors into the same banded L tables of k hashes. Sparse (CSR) input
+# is hashed at a cost proportional to the non-zeros, and with seeded
+# projections the gaussian coefficients are generated per dimension on
+# demand instead of being stored as an (L, k, d) array.
 #
 # References: 
 #
 # 1. Nearest Neighbor Methods in Learning and Vision: Theory and Practice,
 # by T. Darrell and P. Indyk and G. Shakhnarovich (eds.), MIT Press,
 # 2006. 
+# 2. A. Z. Broder, On the resemblance and containment of documents,
+# Compression and Complexity of Sequences, 1997.
+# 3. M. S. Charikar, Similarity estimation techniques from rounding
+# algorithms, STOC 2002.
 #
 
 #####
 import sys
 import math
 import random
+import zlib
 import numpy
 
 ### Locality Sensitive Hash ###
 class LocalitySensitiveHash :
 
     ### constructor ###
-    def __init__(self, d, k, l):
+    def __init__(self, d, k, l, params=None, seeded=False, w=4):
         # fix variables
-        self.w = 4 # k-bin resolution
+        self.w = w # k-bin resolution
         self.d = d
         self.k = k
         self.l = l
         self.prime1 = (2**31-1)
         self.prime2 = (2**32-5)
+        self.batchRows = 4096 # rows hashed per block in hash_batch
+        self.batchDims = 4096 # seeded projection columns per block
 
-        # gaussian coefficient array
+        # stored (e.g. memory-mapped) or generated random parameters;
+        # seeded hashes generate the gaussian projections on demand
+        if (params is not None) :
+            self.setStoredParameters(params)
+        else :
+            self.generate(seeded)
+
+        # printing
+        print '# seeds: ', self.seedA, self.seedB, self.seedR1, self.seedR2
+        print '# parameters: ', self.d, self.k, self.l, self.w
+#        print '# random a-vectors:'
+#        print self.a
+#        print '# random b-values:'
+#        print self.b
+        self.minh = +int(self.prime1)
+        self.maxh = -int(self.prime1)
+        self.collectStats = False # track min(h) and max(h)
+
+    ### random parameters from the fixed seeds ###
+    def generate(self, seeded=False) :
+        # gaussian coefficient array (none if seeded)
         self.seedA = long(self.prime1)
-        random.seed(self.seedA)
-        self.a = numpy.zeros((self.l, self.k, self.d), dtype=numpy.float)
-        for ll in range(self.l) :
-            for kk in range(self.k) :
-                for dd in range(self.d) :
-                    self.a[ll][kk][dd] = random.gauss(0.0, 1.0)
+        self.a = None
+        if (not seeded) :
+            random.seed(self.seedA)
+            self.a = numpy.zeros((self.l, self.k, self.d), dtype=numpy.float)
+            for ll in range(self.l) :
+                for kk in range(self.k) :
+                    for dd in range(self.d) :
+                        self.a[ll][kk][dd] = random.gauss(0.0, 1.0)
         
         # uniformly random constants array
         self.seedB = long(((self.prime1+1)>>1)-1)
@@ -53,36 +87,38 @@ class LocalitySensitiveHash :
             for kk in range(self.k) :
                 self.b[ll][kk] = (random.random() * self.w)
 
-        # R_1 hash coefficient array
+        # R_1 and R_2 hash coefficient arrays
         self.seedR1 =  long(((self.prime1+1)>>2)-1)
-        self.r1 = numpy.zeros((self.k), dtype=numpy.long)
-        random.seed(self.seedR1)
-        for kk in range(self.k) :
-            self.r1[kk] = (random.randint(1, long(self.prime1)))
-                             
-        # R_2 hash coefficient array
+        self.r1 = getKeyCoefficients(self.seedR1, self.k, self.prime1)
         self.seedR2 =  long(((self.prime1+1)>>3)-1)
-        self.r2 = numpy.zeros((self.k), dtype=numpy.long)
-        random.seed(self.seedR2)
-        for kk in range(self.k) :
-            self.r2[kk] = (random.randint(1, long(self.prime1)))
+        self.r2 = getKeyCoefficients(self.seedR2, self.k, self.prime1)
 
-        # printing
-        print '# seeds: ', self.seedA, self.seedB, self.seedR1, self.seedR2
-        print '# parameters: ', self.d, self.k, self.l, self.w
-#        print '# random a-vectors:'
-#        print self.a
-#        print '# random b-values:'
-#        print self.b
-        self.minh = +int(self.prime1)
-        self.maxh = -int(self.prime1)
+    ### stored parameters; dict of w, seeds, a, b, r1 and r2 ###
+    def setStoredParameters(self, params) :
+        self.w = params['w']
+        [self.seedA, self.seedB, self.seedR1, self.seedR2] = params['seeds']
+        self.a = params['a']
+        self.b = params['b']
+        self.r1 = params['r1']
+        self.r2 = params['r2']
+
+    ### parameters for storing ###
+    def getStoredParameters(self) :
+        seeds = [self.seedA, self.seedB, self.seedR1, self.seedR2]
+        return {'w' : self.w, 'seeds' : seeds, 'a' : self.a, 'b' : self.b, \
+            'r1' : self.r1, 'r2' : self.r2}
 
     ### hash input v ###
     def getHashes(self, v) :
         # check dimensionality
-        if (len(v) != d) :
+        if (len(v) != self.d) :
             return None
 
+        # seeded projections exist only in the batch path
+        if (self.a is None) :
+            [keys, values] = self.hash_batch(v)
+            return [[keys[0][ll], values[0][ll]] for ll in range(self.l)]
+
         # loop over k random vs 
         hashKeyValueList = []
         for ll in range(self.l) :
@@ -97,12 +133,10 @@ class LocalitySensitiveHash :
     def getHashesL(self, ll, v) :
         hashes = []
         for kk in range(self.k) :
-            hk = self.getHashK(ll, kk, v)
-            if (hk < self.minh) :
-                self.minh = hk
-            if (hk > self.maxh) :
-                self.maxh = hk
-            hashes.append(hk)
+            hashes.append(self.getHashK(ll, kk, v))
+        if (self.collectStats) :
+            self.minh = min(self.minh, min(hashes))
+            self.maxh = max(self.maxh, max(hashes))
         return hashes
 
     ### hashes ###
@@ -132,10 +166,369 @@ class LocalitySensitiveHash :
         # done
         return [key, value]
 
+    ### hash a batch of points; dense (n, d) rows, or with sparse=True a ###
+    ### CSR batch given as (indptr, indices, data) or scipy.sparse-like ###
+    ### object ###
+    def hash_batch(self, points, sparse=False) :
+        if (sparse) :
+            return self.hashSparseBatch(points)
+
+        # check dimensionality
+        pts = numpy.asarray(points, dtype=numpy.float)
+        if (pts.ndim == 1) :
+            pts = pts.reshape(1, -1)
+        if (pts.ndim != 2 or pts.shape[1] != self.d) :
+            msg = 'LocalitySensitiveHash(' + str(self.d) + '); ' + \
+                'invalid batch shape: ' + str(pts.shape)
+            raise ValueError(msg)
+
+        # hash in row blocks to bound the (rows, L*k) temporaries
+        n = pts.shape[0]
+        keys = numpy.zeros((n, self.l), dtype=numpy.int64)
+        values = numpy.zeros((n, self.l), dtype=numpy.int64)
+        for start in range(0, n, self.batchRows) :
+            stop = min(n, start + self.batchRows)
+            hashes = self.getHashesBatch(pts[start:stop])
+            [keys[start:stop], values[start:stop]] = \
+                self.getKeyValueBatch(hashes)
+
+        # done
+        return [keys, values]
+
+    ### hash one sparse vector given by index and value arrays ###
+    def hash_sparse(self, indices, values) :
+        indptr = numpy.array([0, len(indices)], dtype=numpy.int64)
+        return self.hashSparseBatch((indptr, indices, values))
+
+    ### hash a CSR batch; the cost is proportional to the non-zeros ###
+    def hashSparseBatch(self, points) :
+        # check dimensionality
+        [indptr, indices, data] = getCsrBatch(points)
+        if (len(indices) > 0 and \
+                (indices.min() < 0 or indices.max() >= self.d)) :
+            msg = 'LocalitySensitiveHash(' + str(self.d) + '); ' + \
+                'index out of bounds in sparse batch'
+            raise ValueError(msg)
+
+        # hash in row blocks
+        n = len(indptr) - 1
+        keys = numpy.zeros((n, self.l), dtype=numpy.int64)
+        values = numpy.zeros((n, self.l), dtype=numpy.int64)
+        for start in range(0, n, self.batchRows) :
+            stop = min(n, start + self.batchRows)
+            ptr = indptr[start:stop+1]
+            hashes = self.getHashesSparse(indices[ptr[0]:ptr[-1]], \
+                data[ptr[0]:ptr[-1]], ptr - ptr[0])
+            [keys[start:stop], values[start:stop]] = \
+                self.getKeyValueBatch(hashes)
+
+        # done
+        return [keys, values]
+
+    ### gaussian projection columns of the given dimensions; shape ###
+    ### (len(dims), L*k), stored or generated from seedA (Box-Muller) ###
+    def getProjectionColumns(self, dims) :
+        lk = self.l * self.k
+        if (self.a is not None) :
+            return self.a.reshape(lk, self.d)[:, dims].T
+        counter = numpy.asarray(dims, dtype=numpy.uint64)[:, None] * \
+            numpy.uint64(2 * lk) + numpy.arange(0, 2 * lk, 2, \
+            dtype=numpy.uint64)
+        scale = 2.0**-53
+        u1 = ((getRandomBits(self.seedA, counter) >> numpy.uint64(11)) \
+            .astype(numpy.float) + 1.0) * scale
+        u2 = (getRandomBits(self.seedA, counter + numpy.uint64(1)) \
+            >> numpy.uint64(11)).astype(numpy.float) * scale
+        return numpy.sqrt(-2.0 * numpy.log(u1)) * numpy.cos(2.0 * math.pi * u2)
+
+    ### hashes of a CSR block; array of shape (n, L, k) ###
+    def getHashesSparse(self, indices, data, indptr, fractions=False) :
+        n = len(indptr) - 1
+        lk = self.l * self.k
+        b = self.b.reshape(lk)
+
+        # projections of the distinct dimensions only
+        h = numpy.zeros((n, lk), dtype=numpy.float)
+        full = numpy.flatnonzero(indptr[1:] > indptr[:-1])
+        if (len(full) > 0) :
+            [dims, inverse] = numpy.unique(indices, return_inverse=True)
+            cols = self.getProjectionColumns(dims)
+            h[full] = numpy.add.reduceat(data[:, None] * cols[inverse], \
+                indptr[full], axis=0)
+        h += b
+        h /= self.w
+        hashes = numpy.floor(h)
+        return self.getHashesRange(hashes, h, fractions)
+
+    ### hashes of a batch; array of shape (n, L, k) ###
+    ### (with fractions, also the positions within the bins in [0, 1)) ###
+    def getHashesBatch(self, pts, fractions=False) :
+        n = pts.shape[0]
+        lk = self.l * self.k
+        b = self.b.reshape(lk)
+
+        # seeded projections, generated in blocks of dimensions
+        if (self.a is None) :
+            h = numpy.zeros((n, lk), dtype=numpy.float)
+            for start in range(0, self.d, self.batchDims) :
+                stop = min(self.d, start + self.batchDims)
+                cols = self.getProjectionColumns(numpy.arange(start, stop))
+                h += numpy.dot(pts[:, start:stop], cols)
+            h += b
+            h /= self.w
+            hashes = numpy.floor(h)
+            return self.getHashesRange(hashes, h, fractions)
+
+        # all L*k projections in one matrix product
+        a = self.a.reshape(lk, self.d)
+        h = numpy.dot(pts, a.T)
+        h += b
+        h /= self.w
+        hashes = numpy.floor(h)
+
+        # the matrix product sums in a different order than getHashK;
+        # both sums lie within gamma_d*|a|*|v| of the exact value, so
+        # only values that close to an integer are recomputed in the
+        # scalar order (the margin is kept per row, with the rounding
+        # of +b and /w included)
+        eps = numpy.finfo(numpy.float).eps
+        gamma = (self.d * eps) / (1.0 - self.d * eps)
+        amax = numpy.sqrt((a * a).sum(axis=1)).max()
+        bmax = numpy.abs(b).max()
+        vnorm = numpy.sqrt((pts * pts).sum(axis=1))
+        margin = (4.0 * gamma * vnorm * amax + \
+                  4.0 * eps * (vnorm * amax + bmax)) / self.w
+        near = numpy.minimum(h - hashes, 1.0 - (h - hashes))
+        [ii, jj] = numpy.nonzero(near <= margin[:, None])
+        if (len(ii) > 0) :
+            hk = numpy.zeros(len(ii), dtype=numpy.float)
+            for dd in range(self.d) :
+                hk += (a[jj, dd] * pts[ii, dd])
+            hk += b[jj]
+            hk /= self.w
+            hashes[ii, jj] = numpy.floor(hk)
+            h[ii, jj] = hk
+
+        # done
+        return self.getHashesRange(hashes, h, fractions)
+
+    ### floor values (n, L*k) to hashes of shape (n, L, k); with ###
+    ### fractions, also the positions h - floor(h) within the bins ###
+    def getHashesRange(self, hashes, h, fractions) :
+        # hash range
+        n = hashes.shape[0]
+        hashes = hashes.astype(numpy.int64).reshape(n, self.l, self.k)
+        if (self.collectStats and n > 0) :
+            self.minh = min(self.minh, int(hashes.min()))
+            self.maxh = max(self.maxh, int(hashes.max()))
+
+        # done
+        if (fractions) :
+            h -= hashes.reshape(n, self.l * self.k)
+            return [hashes, h.reshape(n, self.l, self.k)]
+        return hashes
+
+    ### hashes of shape (..., k) to key-value arrays of shape (...) ###
+    def getKeyValueBatch(self, hashes) :
+        # int64 wrap-around is the same as in the scalar getKeyValue
+        key = (hashes * self.r1).sum(axis=-1) % self.prime2
+        value = (hashes * self.r2).sum(axis=-1) % self.prime2
+        return [key, value]
+
     ### printing ###
     def printInfo(self) :
         print '# min(h) = ', self.minh, '; max(h) = ', self.maxh
 
+### MinHash (Jaccard similarity of token sets) ###
+class MinHash :
+
+    ### constructor ###
+    def __init__(self, k, l):
+        # fix variables
+        self.k = k
+        self.l = l
+        self.prime1 = (2**31-1)
+        self.prime2 = (2**32-5)
+        self.batchRows = 4096 # documents hashed per block in hash_batch
+
+        # universal hash functions (c1 * x + c2) mod prime1, one per band row
+        self.seedA = long(self.prime1)
+        random.seed(self.seedA)
+        self.c1 = numpy.zeros((self.l * self.k), dtype=numpy.long)
+        self.c2 = numpy.zeros((self.l * self.k), dtype=numpy.long)
+        for kk in range(self.l * self.k) :
+            self.c1[kk] = random.randint(1, long(self.prime1) - 1)
+            self.c2[kk] = random.randint(0, long(self.prime1) - 1)
+
+        # R_1 and R_2 hash coefficient arrays
+        self.seedR1 =  long(((self.prime1+1)>>2)-1)
+        self.r1 = getKeyCoefficients(self.seedR1, self.k, self.prime1)
+        self.seedR2 =  long(((self.prime1+1)>>3)-1)
+        self.r2 = getKeyCoefficients(self.seedR2, self.k, self.prime1)
+
+    ### hash a batch of documents; token lists, or with sparse=True a CSR ###
+    ### batch (as in LocalitySensitiveHash.hash_batch) whose column ###
+    ### indices are the token ids ###
+    def hash_batch(self, docs, sparse=False) :
+        if (sparse) :
+            [indptr, tokens] = getCsrBatch(docs)[:2]
+        else :
+            [indptr, tokens] = getTokenBatch(docs)[:2]
+        x = tokens % self.prime1
+        n = len(indptr) - 1
+        keys = numpy.zeros((n, self.l), dtype=numpy.int64)
+        values = numpy.zeros((n, self.l), dtype=numpy.int64)
+        for start in range(0, n, self.batchRows) :
+            stop = min(n, start + self.batchRows)
+            ptr = indptr[start:stop+1]
+            hashes = self.getHashesBatch(x[ptr[0]:ptr[-1]], ptr - ptr[0])
+            [keys[start:stop], values[start:stop]] = \
+                getKeyValueBatch(hashes, self.r1, self.r2, self.prime2)
+        return [keys, values]
+
+    ### minimum hashes of the documents; array of shape (n, L, k) ###
+    def getHashesBatch(self, x, indptr) :
+        # empty documents keep the value prime1
+        n = len(indptr) - 1
+        hashes = numpy.zeros((n, self.l * self.k), dtype=numpy.int64)
+        hashes += self.prime1
+        full = numpy.flatnonzero(indptr[1:] > indptr[:-1])
+        if (len(full) > 0) :
+            h = (x[:, None] * self.c1 + self.c2) % self.prime1
+            hashes[full] = numpy.minimum.reduceat(h, indptr[full], axis=0)
+        return hashes.reshape(n, self.l, self.k)
+
+### SimHash (cosine similarity of sparse vectors) ###
+class SimHash :
+
+    ### constructor ###
+    def __init__(self, k, l):
+        # fix variables
+        self.k = k
+        self.l = l
+        self.prime1 = (2**31-1)
+        self.prime2 = (2**32-5)
+        self.batchRows = 4096 # documents hashed per block in hash_batch
+
+        # random hyperplane signs are drawn from a hash of the seed,
+        # the feature index and the hyperplane, so nothing of size d
+        # is stored
+        self.seedA = long(self.prime1)
+
+        # R_1 and R_2 hash coefficient arrays
+        self.seedR1 =  long(((self.prime1+1)>>2)-1)
+        self.r1 = getKeyCoefficients(self.seedR1, self.k, self.prime1)
+        self.seedR2 =  long(((self.prime1+1)>>3)-1)
+        self.r2 = getKeyCoefficients(self.seedR2, self.k, self.prime1)
+
+    ### hash a batch of vectors; dense (n, d) rows, or with sparse=True a ###
+    ### CSR batch (as in LocalitySensitiveHash.hash_batch) ###
+    def hash_batch(self, points, sparse=False) :
+        if (sparse) :
+            return self.hashCsrBatch(getCsrBatch(points))
+        return self.hashCsrBatch(getDenseBatch(points))
+
+    ### hash a batch of token lists as vectors of token counts ###
+    def hash_tokens(self, docs) :
+        return self.hashCsrBatch(getTokenBatch(docs))
+
+    ### hash CSR arrays [indptr, indices, data] ###
+    def hashCsrBatch(self, batch) :
+        [indptr, indices, data] = batch
+        n = len(indptr) - 1
+        keys = numpy.zeros((n, self.l), dtype=numpy.int64)
+        values = numpy.zeros((n, self.l), dtype=numpy.int64)
+        for start in range(0, n, self.batchRows) :
+            stop = min(n, start + self.batchRows)
+            ptr = indptr[start:stop+1]
+            hashes = self.getHashesBatch(indices[ptr[0]:ptr[-1]], \
+                data[ptr[0]:ptr[-1]], ptr - ptr[0])
+            [keys[start:stop], values[start:stop]] = \
+                getKeyValueBatch(hashes, self.r1, self.r2, self.prime2)
+        return [keys, values]
+
+    ### sign bits of the projections; array of shape (n, L, k) ###
+    def getHashesBatch(self, indices, data, indptr) :
+        n = len(indptr) - 1
+        lk = self.l * self.k
+        hashes = numpy.zeros((n, lk), dtype=numpy.int64)
+        full = numpy.flatnonzero(indptr[1:] > indptr[:-1])
+        if (len(full) > 0) :
+            counter = indices.astype(numpy.uint64)[:, None] * numpy.uint64(lk) \
+                + numpy.arange(lk, dtype=numpy.uint64)
+            bits = getRandomBits(self.seedA, counter) >> numpy.uint64(63)
+            signs = 1.0 - 2.0 * bits
+            s = numpy.add.reduceat(data[:, None] * signs, indptr[full], axis=0)
+            hashes[full] = (s > 0)
+        return hashes.reshape(n, self.l, self.k)
+
+### k random key coefficients in [1, prime] from seed ###
+def getKeyCoefficients(seed, k, prime) :
+    r = numpy.zeros((k), dtype=numpy.long)
+    random.seed(seed)
+    for kk in range(k) :
+        r[kk] = (random.randint(1, long(prime)))
+    return r
+
+### hashes of shape (..., k) to key-value arrays of shape (...); each ###
+### term is reduced first, so large hash values (MinHash) do not wrap ###
+def getKeyValueBatch(hashes, r1, r2, prime2) :
+    key = ((hashes * r1) % prime2).sum(axis=-1) % prime2
+    value = ((hashes * r2) % prime2).sum(axis=-1) % prime2
+    return [key, value]
+
+### 64 random bits per counter (splitmix64 finalizer) ###
+def getRandomBits(seed, counter) :
+    z = counter + numpy.uint64((seed * 0x9e3779b97f4a7c15) & (2**64-1))
+    z = (z ^ (z >> numpy.uint64(30))) * numpy.uint64(0xbf58476d1ce4e5b9)
+    z = (z ^ (z >> numpy.uint64(27))) * numpy.uint64(0x94d049bb133111eb)
+    return z ^ (z >> numpy.uint64(31))
+
+### CSR batch to arrays [indptr, indices, data]; docs is a tuple ###
+### (indptr, indices[, data]) or an object with indptr, indices and data ###
+### (e.g. scipy.sparse.csr_matrix); data defaults to ones ###
+def getCsrBatch(docs) :
+    if (not isinstance(docs, tuple)) :
+        docs = (docs.indptr, docs.indices, docs.data)
+    indptr = numpy.asarray(docs[0], dtype=numpy.int64)
+    indices = numpy.asarray(docs[1], dtype=numpy.int64)
+    if (len(docs) > 2) :
+        data = numpy.asarray(docs[2], dtype=numpy.float)
+    else :
+        data = numpy.ones(len(indices), dtype=numpy.float)
+    return [indptr, indices, data]
+
+### dense (n, d) rows to CSR arrays [indptr, indices, data] ###
+def getDenseBatch(rows) :
+    rows = numpy.asarray(rows, dtype=numpy.float)
+    if (rows.ndim == 1) :
+        rows = rows.reshape(1, -1)
+    if (rows.ndim != 2) :
+        raise ValueError('invalid batch shape: ' + str(rows.shape))
+    [ii, jj] = numpy.nonzero(rows)
+    indptr = numpy.zeros(len(rows) + 1, dtype=numpy.int64)
+    indptr[1:] = numpy.cumsum(numpy.bincount(ii, minlength=len(rows)))
+    return [indptr, jj.astype(numpy.int64), rows[ii, jj]]
+
+### token lists (strings or integer ids) to CSR arrays [indptr, ###
+### indices, data]; strings are hashed with crc32 to 32-bit ids ###
+def getTokenBatch(docs) :
+    indptr = [0]
+    indices = []
+    for doc in docs :
+        for token in doc :
+            if (isinstance(token, unicode)) :
+                token = token.encode('utf-8')
+            if (isinstance(token, str)) :
+                token = zlib.crc32(token)
+            elif (not isinstance(token, (int, long, numpy.integer))) :
+                raise TypeError('invalid token ' + repr(token))
+            indices.append(token & 0xffffffff)
+        indptr.append(len(indices))
+    indptr = numpy.array(indptr, dtype=numpy.int64)
+    indices = numpy.array(indices, dtype=numpy.int64)
+    return [indptr, indices, numpy.ones(len(indices), dtype=numpy.float)]
+
 ### n random points in d dimensions
 def randomCoordinates(d, n) :
     pts = numpy.zeros((n, d), dtype=numpy.float)
@@ -147,6 +540,17 @@ def randomCoordinates(d, n) :
             pts[nn][dd] = (random.random() + add)
     return pts
 
+### k, L and rho for n points and probabilities p1, p2 ###
+def getParameters(n, p1, p2) :
+    k = int(math.log(n) / math.log(1.0/p2) + .5)
+    if (k < 5) :
+        k = int(5)
+    rho = math.log(1./p1) / math.log(1./p2)
+    l = int(n**rho + .5)
+    if (l < 3) :
+        l = int(3)
+    return [k, l, rho]
+
 ### n random points in d dimensions
 def distance(x, y) :
     d = 0.0
@@ -156,12 +560,13 @@ def distance(x, y) :
 
 ### main ###
 if __name__ == '__main__':
+    import lsh_index
 
     # check args
     args = sys.argv[1:] 
     nargs = len(args)
     if (nargs < 2) :
-        print '# usage: lsh.py d n'
+        print '# usage: lsh.py d n [pair_file]'
         sys.exit()
 
     # read input parameters 
@@ -173,13 +578,7 @@ if __name__ == '__main__':
     p2 = 0.01 # false positive probability
 
     # compute 
-    k = int(math.log(n) / math.log(1.0/p2) + .5)
-    if (k < 5) :
-        k = int(5)
-    rho = math.log(1./p1) / math.log(1./p2)
-    l = int(n**rho + .5)
-    if (l < 3) :
-        l = int(3)
+    [k, l, rho] = getParameters(n, p1, p2)
 
     # print
     print '# d = ', d, '; n = ', n, '; p1 = ', p1, \
@@ -191,18 +590,20 @@ if __name__ == '__main__':
     print '# points:'
     print pts
 
-    # distances
-    print '# distances:'
-    for i in range(n) :
-        for j in range(i+1, n) :
-            dst = distance(pts[i], pts[j])
-            close = 0
-            if (dst < 1.0) :
-                close = 1
-            print 'dist(i,j) = ', i, j, dst, '; close = ', close
-
     # locality sensitive hashing
     lsh = LocalitySensitiveHash(d, k, l)
+    lsh.collectStats = True
+
+    # close pairs from the shared buckets (self-join)
+    print '# close pairs (i, j, dist):'
+    index = lsh_index.LocalitySensitiveHashIndex(lsh, pts)
+    out = sys.stdout
+    if (nargs > 2) :
+        out = open(args[2], 'w')
+    cnt = lsh_index.selfJoin(index, 1.0, out)
+    if (nargs > 2) :
+        out.close()
+    print '# number of close pairs = ', cnt
 
     # hashing
     print ''
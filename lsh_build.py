@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+
+# Date: 2026-10-18
+# Author: agent <agent@local>
+# Description: Parallel out-of-core build of an lsh_index.py index file.
+#
+# lsh_build.py hashes a point set stored as a .npy file or as raw float32
+# values (n rows of d values) without loading it: the input is memory-
+# mapped and hashed in chunks by a process pool. The hash parameters are
+# written once into a parameter file that every worker maps at start-up,
+# so tasks only carry row ranges. Each chunk is written as a sorted run
+# per table, and the runs are merged per table (in parallel) with a
+# block-wise k-way merge, so memory stays bounded by the chunk and block
+# sizes whatever the number of points. The result is the same index file
+# that LocalitySensitiveHashIndex.save writes for the same points.
+#
+
+#####
+import sys
+import os
+import time
+import shutil
+import tempfile
+import multiprocessing
+import numpy
+import lsh
+import lsh_index
+
+# worker state, set once per process by initWorker
+workerLsh = None
+workerPoints = None
+
+### points of a .npy or raw float32 file as a read-only memory map ###
+def openPoints(fn, d) :
+    if (fn.endswith('.npy')) :
+        pts = numpy.load(fn, mmap_mode='r')
+    else :
+        pts = numpy.memmap(fn, dtype=numpy.float32, mode='r')
+        pts = pts.reshape(-1, d)
+    if (pts.ndim != 2 or pts.shape[1] != d) :
+        raise ValueError('invalid point file shape: ' + str(pts.shape))
+    return pts
+
+### worker start-up: map the parameter and point files ###
+def initWorker(paramFile, pointFile, d) :
+    global workerLsh, workerPoints
+    [header, arrays] = lsh_index.readIndexFile(paramFile)
+    workerLsh = lsh_index.getStoredHash(header, arrays)
+    workerPoints = openPoints(pointFile, d)
+
+### hash rows [start, stop) into a run of per-table sorted codes/ids ###
+def hashChunk(task) :
+    [start, stop, prefix] = task
+    pts = numpy.asarray(workerPoints[start:stop], dtype=numpy.float)
+    [keys, values] = workerLsh.hash_batch(pts)
+    codes = lsh_index.getBucketCodes(keys, values).T
+    order = numpy.argsort(codes, axis=1, kind='mergesort')
+    rows = numpy.arange(workerLsh.l)[:, None]
+    numpy.save(prefix + '.codes.npy', codes[rows, order])
+    numpy.save(prefix + '.ids.npy', order + start)
+    return stop - start
+
+### k-way merge of the runs of table ll into codes/starts/ids files ###
+def mergeTable(task) :
+    [ll, prefixes, out, idtype, block] = task
+    runs = []
+    for prefix in prefixes :
+        codes = numpy.load(prefix + '.codes.npy', mmap_mode='r')
+        ids = numpy.load(prefix + '.ids.npy', mmap_mode='r')
+        runs.append([codes[ll], ids[ll]])
+    pos = [0] * len(runs)
+    fcodes = open(out + '.codes', 'wb')
+    fstarts = open(out + '.starts', 'wb')
+    fids = open(out + '.ids', 'wb')
+
+    # merge up to the smallest block end of the unfinished runs; every
+    # run is taken up to and including that code (past its block if the
+    # bucket continues), so each bucket is merged in one step
+    emitted = 0
+    while (True) :
+        limit = None
+        for r in range(len(runs)) :
+            codes = runs[r][0]
+            end = pos[r] + block
+            if (end < len(codes)) :
+                if (limit is None or codes[end - 1] < limit) :
+                    limit = codes[end - 1]
+        mcodes = []
+        mids = []
+        for r in range(len(runs)) :
+            [codes, ids] = runs[r]
+            stop = len(codes)
+            if (limit is not None) :
+                stop = pos[r] + numpy.searchsorted(codes[pos[r]:], limit, \
+                    side='right')
+            mcodes.append(numpy.asarray(codes[pos[r]:stop]))
+            mids.append(numpy.asarray(ids[pos[r]:stop]))
+            pos[r] = stop
+        mcodes = numpy.concatenate(mcodes)
+        if (len(mcodes) == 0) :
+            break
+
+        # runs are in id order and hold whole buckets here, so the stable
+        # sort keeps the ids of a bucket ascending
+        order = numpy.argsort(mcodes, kind='mergesort')
+        mcodes = mcodes[order]
+        numpy.concatenate(mids)[order].astype(idtype).tofile(fids)
+
+        # bucket boundaries
+        first = numpy.ones(len(mcodes), dtype=numpy.bool_)
+        first[1:] = (mcodes[1:] != mcodes[:-1])
+        first = numpy.flatnonzero(first)
+        mcodes[first].tofile(fcodes)
+        (first + emitted).astype(numpy.int64).tofile(fstarts)
+        emitted += len(mcodes)
+
+    # closing start offset
+    numpy.array([emitted], dtype=numpy.int64).tofile(fstarts)
+    fcodes.close()
+    fstarts.close()
+    fids.close()
+    return ll
+
+### build the index file of a point file with a pool of workers ###
+def buildIndex(pointFile, d, k, l, fn, workers=None, chunk=65536, \
+        block=1048576, seeded=False, w=4) :
+    pts = openPoints(pointFile, d)
+    n = len(pts)
+    if (n == 0) :
+        raise ValueError('no points in ' + pointFile)
+    idtype = numpy.int32
+    if (n >= 2**31) :
+        idtype = numpy.int64
+
+    # parameters written once, mapped by every worker
+    h = lsh.LocalitySensitiveHash(d, k, l, seeded=seeded, w=w)
+    params = lsh_index.getParameterArrays(h)
+    tmp = tempfile.mkdtemp(prefix='lsh_build.', \
+        dir=os.path.dirname(os.path.abspath(fn)))
+    try :
+        paramFile = os.path.join(tmp, 'params')
+        lsh_index.writeIndexFile(paramFile, h, 0, params)
+        pool = multiprocessing.Pool(workers, initWorker, \
+            (paramFile, pointFile, d))
+
+        # sorted runs per chunk
+        tasks = []
+        for start in range(0, n, chunk) :
+            prefix = os.path.join(tmp, 'run%09d' % start)
+            tasks.append([start, min(n, start + chunk), prefix])
+        pool.map(hashChunk, tasks, 1)
+        prefixes = [task[2] for task in tasks]
+
+        # merge the runs table by table
+        block = max(1, block // len(prefixes))
+        outs = [os.path.join(tmp, 'table%04d' % ll) for ll in range(l)]
+        pool.map(mergeTable, \
+            [[ll, prefixes, outs[ll], idtype, block] for ll in range(l)], 1)
+        pool.close()
+        pool.join()
+
+        # the index file from the merged tables, mapped segment by segment
+        codes = [numpy.memmap(out + '.codes', dtype=numpy.uint64, mode='r') \
+            for out in outs]
+        starts = [numpy.memmap(out + '.starts', dtype=numpy.int64, mode='r') \
+            for out in outs]
+        ids = [numpy.memmap(out + '.ids', dtype=idtype, mode='r') \
+            for out in outs]
+        offsets = numpy.zeros(l + 1, dtype=numpy.int64)
+        offsets[1:] = numpy.cumsum([len(c) for c in codes])
+        arrays = params + [['offsets', offsets], \
+            ['codes', codes, [offsets[l]]], \
+            ['starts', starts, [offsets[l] + l]], \
+            ['ids', ids, [l, n]], ['points', pts]]
+        lsh_index.writeIndexFile(fn, h, n, arrays)
+    finally :
+        shutil.rmtree(tmp)
+
+### main ###
+if __name__ == '__main__':
+
+    # check args
+    args = sys.argv[1:]
+    nargs = len(args)
+    if (nargs < 3) :
+        print '# usage: lsh_build.py point_file d index_file [workers] [chunk]'
+        sys.exit()
+
+    # read input parameters
+    pointFile = args[0]
+    d = int(args[1])
+    fn = args[2]
+    workers = None
+    if (nargs > 3) :
+        workers = int(args[3])
+    chunk = 65536
+    if (nargs > 4) :
+        chunk = int(args[4])
+
+    # parameters as in lsh.py
+    n = len(openPoints(pointFile, d))
+    [k, l, rho] = lsh.getParameters(n, 0.99, 0.01)
+    print '# d = ', d, '; n = ', n, '; k = ', k, '; L = ', l
+
+    # build
+    start = time.time()
+    buildIndex(pointFile, d, k, l, fn, workers, chunk)
+    print '# build time = ', (time.time() - start), 's'
@@ -0,0 +1,728 @@
+#!/usr/bin/env python
+
+# Date: 2026-10-18
+# Author: agent <agent@local>
+# Description: Nearest neighbour index on top of lsh.py.
+#
+# lsh_index.py stores the L hash tables of a LocalitySensitiveHash as
+# sorted arrays: for each table the (key, value) pairs of the points are
+# packed into one 64-bit bucket code, the point ids are sorted by code
+# and each distinct code maps to a contiguous range of point ids. A
+# query collects the ids of the buckets the query point falls into and
+# re-ranks them with the exact euclidean distance. With multi-probing
+# (Ref. [1]) the query also visits the neighbouring buckets most likely
+# to hold near points, so fewer tables give the same recall. An index
+# is saved into one file (parameters, seeds, tables and points) that
+# loadIndex memory-maps without rehashing, so query processes start in
+# milliseconds and share the pages of one copy. The mutable index takes
+# inserts and deletes into an append-only delta segment and tombstones
+# and merges them into new main tables in a background compaction.
+#
+# References:
+#
+# 1. Q. Lv, W. Josephson, Z. Wang, M. Charikar, K. Li, Multi-probe LSH:
+# efficient indexing for high-dimensional similarity search, VLDB 2007.
+#
+
+#####
+import sys
+import time
+import json
+import struct
+import heapq
+import array
+import threading
+import numpy
+import lsh
+
+### (key, value) arrays to 64-bit bucket codes ###
+def getBucketCodes(keys, values) :
+    # keys and values are below prime2 < 2^32
+    codes = numpy.left_shift(keys.astype(numpy.uint64), numpy.uint64(32))
+    codes |= values.astype(numpy.uint64)
+    return codes
+
+### exact re-ranking of candidate points (with the given ids) by the ###
+### distance to v; the k nearest ids and distances ###
+def rerank(v, points, ids, k) :
+    diff = points - v
+    dist = numpy.sqrt(numpy.einsum('ij,ij->i', diff, diff))
+    if (len(dist) > k) :
+        top = numpy.argpartition(dist, k - 1)[:k]
+        ids = ids[top]
+        dist = dist[top]
+    order = numpy.argsort(dist, kind='mergesort')
+    return [ids[order], dist[order]]
+
+### Locality Sensitive Hash Index ###
+class LocalitySensitiveHashIndex :
+
+    ### constructor; tables = [codes, starts, ids] skips the build, ###
+    ### codes of shape (n, L) skip the hashing ###
+    def __init__(self, lsh, points, tables=None, codes=None) :
+        self.lsh = lsh
+        self.points = numpy.asarray(points)
+        self.n = len(self.points)
+        self.collectStats = False # record candidates per query
+        self.queryCandidates = array.array('l')
+        if (tables is not None) :
+            [self.codes, self.starts, self.ids] = tables
+            return
+        if (codes is None) :
+            [keys, values] = self.lsh.hash_batch(self.points)
+            codes = getBucketCodes(keys, values)
+        self.build(codes)
+
+    ### sorted bucket arrays from per-point codes of shape (n, L) ###
+    def build(self, codes) :
+        # point ids fit 32 bits for all practical sizes
+        idtype = numpy.int32
+        if (self.n >= 2**31) :
+            idtype = numpy.int64
+
+        # per table: distinct codes, start offsets and sorted point ids
+        self.codes = []
+        self.starts = []
+        self.ids = numpy.zeros((self.lsh.l, self.n), dtype=idtype)
+        for ll in range(self.lsh.l) :
+            order = numpy.argsort(codes[:, ll], kind='mergesort')
+            srtd = codes[order, ll]
+            first = numpy.ones(self.n, dtype=numpy.bool_)
+            first[1:] = (srtd[1:] != srtd[:-1])
+            first = numpy.flatnonzero(first)
+            self.codes.append(srtd[first])
+            self.starts.append(numpy.append(first, self.n))
+            self.ids[ll] = order
+
+    ### bucket codes of the indexed points; shape (n, L) ###
+    def getPointCodes(self) :
+        codes = numpy.zeros((self.n, self.lsh.l), dtype=numpy.uint64)
+        for ll in range(self.lsh.l) :
+            sizes = numpy.diff(self.starts[ll])
+            codes[self.ids[ll], ll] = numpy.repeat(self.codes[ll], sizes)
+        return codes
+
+    ### point ids sharing a bucket with the codes ###
+    ### (one code per table, or codes probed in the given tables) ###
+    def getCandidates(self, codes, tables=None) :
+        if (tables is None) :
+            tables = range(self.lsh.l)
+        found = []
+        for [ll, code] in zip(tables, codes) :
+            tcodes = self.codes[ll]
+            pos = numpy.searchsorted(tcodes, code)
+            if (pos < len(tcodes) and tcodes[pos] == code) :
+                starts = self.starts[ll]
+                found.append(self.ids[ll][starts[pos]:starts[pos+1]])
+        if (len(found) == 0) :
+            return numpy.zeros(0, dtype=self.ids.dtype)
+        return numpy.unique(numpy.concatenate(found))
+
+    ### candidates of v; the home buckets plus up to probes extra ones ###
+    def getQueryCandidates(self, v, probes=0) :
+        [tables, codes] = self.getQueryCodes(v, probes)
+        candidates = self.getCandidates(codes, tables)
+        if (self.collectStats) :
+            self.queryCandidates.append(len(candidates))
+        return candidates
+
+    ### tables and bucket codes visited by a query ###
+    def getQueryCodes(self, v, probes=0) :
+        # home buckets only
+        if (probes <= 0) :
+            [keys, values] = self.lsh.hash_batch(v)
+            return [range(self.lsh.l), getBucketCodes(keys, values)[0]]
+
+        # perturbed hashes of the best probes in all tables
+        pts = v.reshape(1, self.lsh.d)
+        [hashes, fracs] = self.lsh.getHashesBatch(pts, True)
+        return self.getProbeCodes(hashes[0], fracs[0], probes)
+
+    ### tables and bucket codes of the home buckets and the probes ###
+    ### from the (L, k) hashes and bin positions of one query ###
+    def getProbeCodes(self, hashes, fracs, probes) :
+        tables = range(self.lsh.l)
+        deltas = [numpy.zeros(self.lsh.k, dtype=numpy.int64)] * self.lsh.l
+        for [ll, delta] in getProbes(fracs, probes) :
+            tables.append(ll)
+            deltas.append(delta)
+        perturbed = hashes[tables] + numpy.array(deltas)
+        [keys, values] = self.lsh.getKeyValueBatch(perturbed)
+        return [tables, getBucketCodes(keys, values)]
+
+    ### k nearest neighbours of a batch of points hashed in one ###
+    ### projection; k may be one value or one per point ###
+    def queryBatch(self, points, k, probes=0) :
+        pts = numpy.asarray(points, dtype=numpy.float).reshape(-1, self.lsh.d)
+        ks = numpy.zeros(len(pts), dtype=numpy.int64) + k
+        if (probes > 0) :
+            [hashes, fracs] = self.lsh.getHashesBatch(pts, True)
+        else :
+            [keys, values] = self.lsh.hash_batch(pts)
+            codes = getBucketCodes(keys, values)
+        results = []
+        for i in range(len(pts)) :
+            if (probes > 0) :
+                [tables, qcodes] = self.getProbeCodes(hashes[i], fracs[i], \
+                    probes)
+                candidates = self.getCandidates(qcodes, tables)
+            else :
+                candidates = self.getCandidates(codes[i])
+            if (self.collectStats) :
+                self.queryCandidates.append(len(candidates))
+            results.append(rerank(pts[i], self.points[candidates], \
+                candidates, ks[i]))
+        return results
+
+    ### k nearest neighbours of v; ids and distances ###
+    def query(self, v, k, probes=0) :
+        v = numpy.asarray(v, dtype=numpy.float)
+        candidates = self.getQueryCandidates(v, probes)
+        return rerank(v, self.points[candidates], candidates, k)
+
+    ### bytes held by the hash parameters and the tables ###
+    def getMemory(self) :
+        size = self.ids.nbytes
+        for [name, arr] in getParameterArrays(self.lsh) :
+            size += arr.nbytes
+        for ll in range(self.lsh.l) :
+            size += self.codes[ll].nbytes + self.starts[ll].nbytes
+        return size
+
+    ### bucket and query statistics (json serializable); per table the ###
+    ### bucket count, a log2 histogram of the bucket sizes and the top ###
+    ### largest buckets, and the candidates per recorded query ###
+    def getStatistics(self, top=10) :
+        tables = []
+        for ll in range(self.lsh.l) :
+            sizes = numpy.diff(self.starts[ll])
+            largest = numpy.argsort(sizes, kind='mergesort')[::-1][:top]
+            tables.append({'table' : ll, 'buckets' : len(sizes), \
+                'mean_size' : float(sizes.mean()) if len(sizes) else 0.0, \
+                'size_histogram' : getLogHistogram(sizes), \
+                'largest' : [{'code' : int(self.codes[ll][b]), \
+                    'size' : int(sizes[b])} for b in largest]})
+        stats = {'points' : self.n, 'tables' : tables}
+
+        # candidates per query
+        cand = numpy.frombuffer(self.queryCandidates, dtype=numpy.int_)
+        if (len(cand) > 0) :
+            stats['queries'] = {'count' : len(cand), \
+                'mean_candidates' : float(cand.mean()), \
+                'max_candidates' : int(cand.max()), \
+                'percentiles' : dict([[str(q), \
+                    float(numpy.percentile(cand, q))] for q in [50, 90, 99]]), \
+                'candidate_histogram' : getLogHistogram(cand)}
+        return stats
+
+    ### statistics into a json file ###
+    def saveStatistics(self, fn, top=10) :
+        f = open(fn, 'w')
+        json.dump(self.getStatistics(top), f, indent=1, sort_keys=True)
+        f.close()
+
+    ### store the parameters, tables and points into one file ###
+    def save(self, fn) :
+        # tables concatenated; table ll holds codes[offsets[ll]:offsets[ll+1]]
+        # and starts[offsets[ll]+ll:offsets[ll+1]+ll+1]
+        nb = [len(c) for c in self.codes]
+        offsets = numpy.zeros(self.lsh.l + 1, dtype=numpy.int64)
+        offsets[1:] = numpy.cumsum(nb)
+        arrays = getParameterArrays(self.lsh) + [['offsets', offsets], \
+            ['codes', numpy.concatenate(self.codes)], \
+            ['starts', numpy.concatenate(self.starts)], \
+            ['ids', self.ids], ['points', self.points]]
+        writeIndexFile(fn, self.lsh, self.n, arrays)
+
+    ### printing ###
+    def printInfo(self) :
+        buckets = [len(c) for c in self.codes]
+        print '# points = ', self.n, '; tables = ', self.lsh.l, \
+            '; buckets = ', buckets
+
+### Mutable Locality Sensitive Hash Index ###
+### (sorted main tables + append-only delta segment + tombstones) ###
+class MutableLocalitySensitiveHashIndex :
+
+    ### constructor; points with their ids (default 0..n-1) ###
+    def __init__(self, lsh, points=None, ids=None, maxDelta=65536) :
+        self.lsh = lsh
+        self.maxDelta = maxDelta # delta size that triggers a compaction
+        self.lock = threading.Lock()
+        self.compactor = None
+
+        # main index with the rows sorted by id; deleted rows are dead
+        if (points is None) :
+            points = numpy.zeros((0, lsh.d), dtype=numpy.float)
+        points = numpy.asarray(points)
+        if (ids is None) :
+            ids = numpy.arange(len(points))
+        ids = numpy.asarray(ids, dtype=numpy.int64)
+        order = numpy.argsort(ids, kind='mergesort')
+        self.mainIds = ids[order]
+        self.main = LocalitySensitiveHashIndex(lsh, points[order])
+        self.mainDead = numpy.zeros(len(ids), dtype=numpy.bool_)
+
+        # delta segment, grown by doubling
+        self.resetDelta(16)
+
+    ### empty delta segment of the given capacity ###
+    def resetDelta(self, capacity) :
+        self.deltaSize = 0
+        self.deltaIds = numpy.zeros(capacity, dtype=numpy.int64)
+        self.deltaPoints = numpy.zeros((capacity, self.lsh.d), \
+            dtype=numpy.float)
+        self.deltaCodes = numpy.zeros((capacity, self.lsh.l), \
+            dtype=numpy.uint64)
+        self.deltaLive = numpy.zeros(capacity, dtype=numpy.bool_)
+        self.deltaPos = {} # id -> delta position of the live version
+        self.pending = [] # ids removed while compacting
+
+    ### main row of id, or -1 ###
+    def getMainRow(self, i) :
+        pos = numpy.searchsorted(self.mainIds, i)
+        if (pos < len(self.mainIds) and self.mainIds[pos] == i) :
+            return pos
+        return -1
+
+    ### hide the current version of id; true if there was one ###
+    def remove(self, i) :
+        found = False
+        pos = self.getMainRow(i)
+        if (pos >= 0 and not self.mainDead[pos]) :
+            self.mainDead[pos] = True
+            found = True
+        if (i in self.deltaPos) :
+            self.deltaLive[self.deltaPos.pop(i)] = False
+            found = True
+        if (self.compactor is not None) :
+            self.pending.append(i)
+        return found
+
+    ### insert (or replace) point v with id ###
+    def insert(self, i, v) :
+        v = numpy.asarray(v, dtype=numpy.float)
+        [keys, values] = self.lsh.hash_batch(v)
+        codes = getBucketCodes(keys, values)[0]
+        self.lock.acquire()
+        try :
+            self.remove(i)
+
+            # grow the delta arrays by doubling
+            pos = self.deltaSize
+            if (pos == len(self.deltaIds)) :
+                cap = 2 * len(self.deltaIds)
+                self.deltaIds = numpy.resize(self.deltaIds, cap)
+                self.deltaPoints = numpy.resize(self.deltaPoints, \
+                    (cap, self.lsh.d))
+                self.deltaCodes = numpy.resize(self.deltaCodes, \
+                    (cap, self.lsh.l))
+                live = numpy.zeros(cap, dtype=numpy.bool_)
+                live[:pos] = self.deltaLive[:pos]
+                self.deltaLive = live
+
+            # append
+            self.deltaIds[pos] = i
+            self.deltaPoints[pos] = v
+            self.deltaCodes[pos] = codes
+            self.deltaLive[pos] = True
+            self.deltaPos[i] = pos
+            self.deltaSize = pos + 1
+        finally :
+            self.lock.release()
+        if (self.deltaSize >= self.maxDelta) :
+            self.compact()
+
+    ### delete id; true if it was present ###
+    def delete(self, i) :
+        self.lock.acquire()
+        try :
+            return self.remove(i)
+        finally :
+            self.lock.release()
+
+    ### k nearest neighbours of v over main and delta; ids and distances ###
+    def query(self, v, k, probes=0) :
+        v = numpy.asarray(v, dtype=numpy.float)
+        self.lock.acquire()
+        try :
+            main = self.main
+            mainIds = self.mainIds
+            mainDead = self.mainDead
+            size = self.deltaSize
+            deltaIds = self.deltaIds[:size]
+            deltaPoints = self.deltaPoints[:size]
+            deltaCodes = self.deltaCodes[:size]
+            deltaLive = self.deltaLive[:size].copy()
+        finally :
+            self.lock.release()
+
+        # live main rows and delta entries in the visited buckets
+        [tables, codes] = main.getQueryCodes(v, probes)
+        rows = main.getCandidates(codes, tables)
+        rows = rows[~mainDead[rows]]
+        match = (deltaCodes[:, tables] == codes).any(axis=1) & deltaLive
+        pos = numpy.flatnonzero(match)
+
+        # exact re-ranking of both
+        cand = numpy.concatenate([mainIds[rows], deltaIds[pos]])
+        pts = numpy.concatenate([main.points[rows], deltaPoints[pos]])
+        return rerank(v, pts, cand, k)
+
+    ### number of live points ###
+    def size(self) :
+        return (len(self.mainIds) - int(self.mainDead.sum()) + \
+            len(self.deltaPos))
+
+    ### merge the delta into the main tables; in a background thread ###
+    ### unless wait, a running compaction is not started twice ###
+    def compact(self, wait=False) :
+        self.lock.acquire()
+        try :
+            thread = self.compactor
+            if (thread is None) :
+                thread = threading.Thread(target=self.compactNow)
+                thread.daemon = True
+                self.compactor = thread
+                thread.start()
+        finally :
+            self.lock.release()
+        if (wait) :
+            thread.join()
+
+    ### compaction; runs outside the lock except for the snapshot/swap ###
+    def compactNow(self) :
+        # snapshot of the live rows and entries; later removals pend
+        self.lock.acquire()
+        try :
+            main = self.main
+            mainIds = self.mainIds
+            dead = self.mainDead.copy()
+            snap = self.deltaSize
+            live = numpy.flatnonzero(self.deltaLive[:snap])
+            deltaIds = self.deltaIds[live]
+            deltaPoints = self.deltaPoints[live]
+            deltaCodes = self.deltaCodes[live]
+            self.pending = []
+        finally :
+            self.lock.release()
+
+        # sort the merged rows by id and build the tables from the codes
+        alive = numpy.flatnonzero(~dead)
+        ids = numpy.concatenate([mainIds[alive], deltaIds])
+        pts = numpy.concatenate([main.points[alive], deltaPoints])
+        codes = numpy.concatenate([main.getPointCodes()[alive], deltaCodes])
+        order = numpy.argsort(ids, kind='mergesort')
+        index = LocalitySensitiveHashIndex(self.lsh, pts[order], \
+            codes=codes[order])
+
+        # swap; changes made since the snapshot go to the new state
+        self.lock.acquire()
+        try :
+            pending = self.pending
+            tail = numpy.flatnonzero(self.deltaLive[snap:self.deltaSize])
+            tail += snap
+            deltaIds = self.deltaIds[tail]
+            deltaPoints = self.deltaPoints[tail]
+            deltaCodes = self.deltaCodes[tail]
+            self.main = index
+            self.mainIds = ids[order]
+            self.mainDead = numpy.zeros(len(order), dtype=numpy.bool_)
+            self.resetDelta(max(16, 2 * len(tail)))
+            for i in pending :
+                pos = self.getMainRow(i)
+                if (pos >= 0) :
+                    self.mainDead[pos] = True
+            m = len(tail)
+            self.deltaIds[:m] = deltaIds
+            self.deltaPoints[:m] = deltaPoints
+            self.deltaCodes[:m] = deltaCodes
+            self.deltaLive[:m] = True
+            self.deltaSize = m
+            for pos in range(m) :
+                self.deltaPos[deltaIds[pos]] = pos
+            self.compactor = None
+        finally :
+            self.lock.release()
+
+### counts of the sizes in the bins [0], [1], [2, 3], [4, 7], ... ###
+def getLogHistogram(sizes) :
+    sizes = numpy.asarray(sizes)
+    if (len(sizes) == 0) :
+        return []
+    bins = numpy.zeros(len(sizes), dtype=numpy.int64)
+    pos = (sizes > 0)
+    bins[pos] = numpy.floor(numpy.log2(sizes[pos])).astype(numpy.int64) + 1
+    counts = numpy.bincount(bins)
+    hist = []
+    for b in range(len(counts)) :
+        lo = 0
+        hi = 0
+        if (b > 0) :
+            lo = 2**(b - 1)
+            hi = 2**b - 1
+        hist.append({'min' : lo, 'max' : hi, 'count' : int(counts[b])})
+    return hist
+
+### index file: magic, header length, json header, 64-byte aligned arrays ###
+indexMagic = 'LSHINDEX'
+indexVersion = 1
+indexAlign = 64
+
+### write header and arrays of an index file; the arrays are given ###
+### as [name, array] or as [name, segments, shape], where the segments ###
+### are written one after the other (e.g. tables built out of core) ###
+def writeIndexFile(fn, lsh, n, arrays) :
+    # array layout after the header
+    layout = []
+    offset = 0
+    for item in arrays :
+        segments = item[1]
+        if (isinstance(segments, list)) :
+            shape = list(item[2])
+        else :
+            segments = [segments]
+            shape = list(segments[0].shape)
+        offset = -(-offset // indexAlign) * indexAlign
+        layout.append([item[0], segments[0].dtype.str, shape, offset])
+        offset += sum([seg.nbytes for seg in segments])
+    header = json.dumps({'version' : indexVersion, 'd' : lsh.d, \
+        'k' : lsh.k, 'l' : lsh.l, 'w' : lsh.w, 'n' : n, \
+        'seeds' : [lsh.seedA, lsh.seedB, lsh.seedR1, lsh.seedR2], \
+        'arrays' : layout})
+    base = len(indexMagic) + 8 + len(header)
+    base = -(-base // indexAlign) * indexAlign
+
+    # header and the arrays at base + offset
+    f = open(fn, 'wb')
+    f.write(indexMagic)
+    f.write(struct.pack('<Q', len(header)))
+    f.write(header)
+    for [item, [name, dtype, shape, offset]] in zip(arrays, layout) :
+        f.write('\0' * (base + offset - f.tell()))
+        segments = item[1]
+        if (not isinstance(segments, list)) :
+            segments = [segments]
+        for seg in segments :
+            numpy.ascontiguousarray(seg).tofile(f)
+    f.close()
+
+### [name, array] list of the stored hash parameters (a is absent ###
+### for seeded projections) ###
+def getParameterArrays(lsh) :
+    params = lsh.getStoredParameters()
+    names = ['a', 'b', 'r1', 'r2']
+    return [[name, params[name]] for name in names \
+        if params[name] is not None]
+
+### hash from the header and arrays of an index file ###
+def getStoredHash(header, arrays) :
+    params = {'w' : header['w'], 'seeds' : header['seeds'], \
+        'a' : arrays.get('a'), 'b' : arrays['b'], \
+        'r1' : arrays['r1'], 'r2' : arrays['r2']}
+    return lsh.LocalitySensitiveHash(header['d'], header['k'], \
+        header['l'], params)
+
+### read the header and memory-map the arrays of an index file ###
+def readIndexFile(fn, mode='r') :
+    f = open(fn, 'rb')
+    magic = f.read(len(indexMagic))
+    if (magic != indexMagic) :
+        f.close()
+        raise IOError('not an LSH index file: ' + fn)
+    [size] = struct.unpack('<Q', f.read(8))
+    header = json.loads(f.read(size))
+    f.close()
+    if (header['version'] != indexVersion) :
+        raise IOError('unsupported LSH index version: ' + \
+            str(header['version']))
+    base = len(indexMagic) + 8 + size
+    base = -(-base // indexAlign) * indexAlign
+
+    # one mapping of the whole file shared by all arrays
+    buf = numpy.memmap(fn, dtype=numpy.uint8, mode=mode)
+    arrays = {}
+    for [name, dtype, shape, offset] in header['arrays'] :
+        arrays[name] = numpy.ndarray(tuple(shape), dtype=numpy.dtype(dtype), \
+            buffer=buf, offset=(base + offset))
+    return [header, arrays]
+
+### load an index file without rehashing; the arrays stay mapped ###
+def loadIndex(fn) :
+    [header, arrays] = readIndexFile(fn)
+    h = getStoredHash(header, arrays)
+
+    # per-table views into the concatenated tables
+    offsets = arrays['offsets']
+    codes = []
+    starts = []
+    for ll in range(h.l) :
+        codes.append(arrays['codes'][offsets[ll]:offsets[ll+1]])
+        starts.append(arrays['starts'][offsets[ll]+ll:offsets[ll+1]+ll+1])
+    tables = [codes, starts, arrays['ids']]
+    return LocalitySensitiveHashIndex(h, arrays['points'], tables)
+
+### multi-probe perturbations (as in Ref. [1]) ###
+def getProbes(fracs, probes) :
+    # fracs are the (L, k) positions of the query within its bins; the
+    # squared distances to the lower (delta = -1) and upper (delta = +1)
+    # bin boundaries are sorted per table, and perturbation sets are
+    # generated in ascending score with the shift/expand heap
+    [l, k] = fracs.shape
+    z = numpy.concatenate([fracs, 1.0 - fracs], axis=1)
+    order = numpy.argsort(z, axis=1, kind='mergesort')
+    score = z[numpy.arange(l)[:, None], order]**2
+    heap = [(score[ll, 0], ll, (0,)) for ll in range(l)]
+    heapq.heapify(heap)
+
+    # pop sets until the probe budget is used
+    result = []
+    while (heap and len(result) < probes) :
+        [s, ll, pset] = heapq.heappop(heap)
+        last = pset[-1]
+        if (last + 1 < 2 * k) :
+            shifted = pset[:-1] + (last + 1,)
+            sshift = s - score[ll, last] + score[ll, last + 1]
+            heapq.heappush(heap, (sshift, ll, shifted))
+            expanded = pset + (last + 1,)
+            sexpand = s + score[ll, last + 1]
+            heapq.heappush(heap, (sexpand, ll, expanded))
+
+        # a valid set perturbs each coordinate at most once
+        pos = order[ll, list(pset)]
+        coords = pos % k
+        if (len(numpy.unique(coords)) < len(coords)) :
+            continue
+        delta = numpy.zeros(k, dtype=numpy.int64)
+        delta[coords] = numpy.where(pos < k, -1, 1)
+        result.append([ll, delta])
+
+    # done
+    return result
+
+### recall, candidates and time (ms) per query against brute force ###
+def measureRecall(index, queries, k, probes=0) :
+    hits = 0
+    ncand = 0
+    elapsed = 0.0
+    for v in queries :
+        start = time.time()
+        candidates = index.getQueryCandidates(v, probes)
+        [ids, dist] = rerank(v, index.points[candidates], candidates, k)
+        elapsed += (time.time() - start)
+        ncand += len(candidates)
+        [eids, edist] = exactNeighbours(index.points, v, k)
+        hits += len(numpy.intersect1d(ids, eids))
+    nq = len(queries)
+    return [float(hits) / (nq * k), float(ncand) / nq, 1000.0 * elapsed / nq]
+
+### pairs closer than radius among the indexed points (self-join); ###
+### writes lines i, j, dist (i < j) to the file out, returns the count ###
+def selfJoin(index, radius, out, block=1048576) :
+    n = index.n
+    l = index.lsh.l
+
+    # bucket number of every point in every table
+    bucket = numpy.zeros((l, n), dtype=numpy.int32)
+    for ll in range(l) :
+        sizes = numpy.diff(index.starts[ll])
+        bucket[ll][index.ids[ll]] = numpy.repeat( \
+            numpy.arange(len(sizes), dtype=numpy.int32), sizes)
+
+    # pairs at distance t within the sorted id ranges of the buckets
+    count = 0
+    for ll in range(l) :
+        ids = index.ids[ll]
+        sizes = numpy.diff(index.starts[ll])
+        end = numpy.repeat(index.starts[ll][1:], sizes)
+        active = numpy.flatnonzero(end - numpy.arange(n) > 1)
+        t = 1
+        while (len(active) > 0) :
+            for start in range(0, len(active), block) :
+                pos = active[start:start+block]
+                i = ids[pos]
+                j = ids[pos + t]
+
+                # report a pair only in the first table it collides in
+                keep = numpy.ones(len(i), dtype=numpy.bool_)
+                for prev in range(ll) :
+                    keep &= (bucket[prev][i] != bucket[prev][j])
+                i = i[keep]
+                j = j[keep]
+
+                # exact distances against the threshold
+                diff = index.points[i] - index.points[j]
+                dist = numpy.sqrt(numpy.einsum('ij,ij->i', diff, diff))
+                close = (dist < radius)
+                pairs = numpy.column_stack([numpy.minimum(i, j)[close], \
+                    numpy.maximum(i, j)[close], dist[close]])
+                numpy.savetxt(out, pairs, fmt='%d\t%d\t%.9g')
+                count += len(pairs)
+            t += 1
+            active = active[active + t < end[active]]
+
+    # done
+    return count
+
+### exact k nearest neighbours by brute force ###
+def exactNeighbours(points, v, k) :
+    diff = points - v
+    dist = numpy.sqrt(numpy.einsum('ij,ij->i', diff, diff))
+    top = numpy.argsort(dist, kind='mergesort')[:k]
+    return [top, dist[top]]
+
+### main ###
+if __name__ == '__main__':
+
+    # check args
+    args = sys.argv[1:] 
+    nargs = len(args)
+    if (nargs < 2) :
+        print '# usage: lsh_index.py d n [queries] [k] [tables probes]'
+        sys.exit()
+
+    # read input parameters 
+    d = int(args[0]) # dimensions
+    n = int(args[1]) # number of points
+    nq = 100 # number of queries
+    if (nargs > 2) :
+        nq = int(args[2])
+    kq = 10 # neighbours per query
+    if (nargs > 3) :
+        kq = int(args[3])
+
+    # parameters as in lsh.py
+    p1 = 0.99
+    p2 = 0.01
+    [k, l, rho] = lsh.getParameters(n, p1, p2)
+    print '# d = ', d, '; n = ', n, '; k = ', k, '; L = ', l
+
+    # build
+    pts = lsh.randomCoordinates(d, n)
+    start = time.time()
+    index = LocalitySensitiveHashIndex(lsh.LocalitySensitiveHash(d, k, l), pts)
+    print '# build time = ', (time.time() - start), 's'
+    index.printInfo()
+
+    # query the first nq points
+    queries = pts[:nq]
+    index.collectStats = True
+    [recall, ncand, ms] = measureRecall(index, queries, kq)
+    stats = index.getStatistics(1)
+    for t in stats['tables'] :
+        print '# table ', t['table'], '; buckets = ', t['buckets'], \
+            '; largest = ', t['largest'][0]['size']
+    print '# candidates per query: ', stats['queries']['percentiles']
+    print '# L = ', l, '; probes = 0; memory = ', index.getMemory(), \
+        'B; recall = ', recall, '; candidates = ', ncand, '; ms = ', ms
+
+    # fewer tables with multi-probing against the configuration above
+    if (nargs > 5) :
+        l2 = int(args[4])
+        probes = int(args[5])
+        index2 = LocalitySensitiveHashIndex( \
+            lsh.LocalitySensitiveHash(d, k, l2), pts)
+        [recall, ncand, ms] = measureRecall(index2, queries, kq, probes)
+        print '# L = ', l2, '; probes = ', probes, '; memory = ', \
+            index2.getMemory(), 'B; recall = ', recall, \
+            '; candidates = ', ncand, '; ms = ', ms
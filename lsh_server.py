@@ -0,0 +1,260 @@
+#!/usr/bin/env python
+
+# Date: 2026-10-18
+# Author: agent <agent@local>
+# Description: Local nearest neighbour query server for lsh_index.py.
+#
+# lsh_server.py keeps an index file loaded (memory-mapped) and answers
+# k nearest neighbour queries over a Unix socket. Connection threads put
+# the requests into a queue; one batching thread collects the requests
+# that arrive together into a micro-batch (up to the batch size, waiting
+# at most the latency limit after the first one), hashes the batch with
+# one projection and replies with the neighbour ids and distances. The
+# load mode runs client threads against a server and reports throughput
+# and latency.
+#
+# Protocol (little-endian): request = uint32 k, uint32 d, d float64;
+# reply = uint32 count, count int64 ids, count float64 distances, or on
+# error uint32 0xffffffff, uint32 length, length bytes of the message. A
+# connection may send any number of requests one after the other.
+#
+
+#####
+import sys
+import os
+import time
+import socket
+import struct
+import threading
+import Queue
+import SocketServer
+import numpy
+import lsh_index
+
+# count of an error reply
+ERROR = 0xffffffff
+
+### read exactly size bytes; None at end of stream ###
+def recvAll(sock, size) :
+    parts = []
+    while (size > 0) :
+        part = sock.recv(size)
+        if (not part) :
+            return None
+        parts.append(part)
+        size -= len(part)
+    return ''.join(parts)
+
+### error reply with the message ###
+def packError(message) :
+    return struct.pack('<II', ERROR, len(message)) + message
+
+### connection handler; one request at a time per connection ###
+class QueryHandler(SocketServer.BaseRequestHandler) :
+
+    ### serve the requests of the connection ###
+    def handle(self) :
+        qs = self.server.queryServer
+        while (True) :
+            head = recvAll(self.request, 8)
+            if (head is None) :
+                return
+            [k, d] = struct.unpack('<II', head)
+            data = recvAll(self.request, 8 * d)
+            if (data is None) :
+                return
+            if (d != qs.index.lsh.d) :
+                self.request.sendall(packError('invalid dimension ' + \
+                    str(d) + '; the index has ' + str(qs.index.lsh.d)))
+                continue
+            v = numpy.frombuffer(data, dtype='<f8')
+            result = qs.submit(v, k)
+            if (isinstance(result, str)) :
+                self.request.sendall(packError(result))
+                continue
+            [ids, dist] = result
+            reply = struct.pack('<I', len(ids)) + \
+                ids.astype('<i8').tostring() + dist.astype('<f8').tostring()
+            self.request.sendall(reply)
+
+### threaded unix stream server ###
+class UnixServer(SocketServer.ThreadingMixIn, SocketServer.UnixStreamServer) :
+    daemon_threads = True
+
+### Query Server ###
+class QueryServer :
+
+    ### constructor ###
+    def __init__(self, index, path, batchSize=64, maxLatency=0.001, \
+            probes=0) :
+        self.index = index
+        self.path = path
+        self.batchSize = batchSize # requests per micro-batch
+        self.maxLatency = maxLatency # seconds to wait for a batch to fill
+        self.probes = probes
+        self.requests = Queue.Queue()
+        self.running = False
+        self.batches = 0
+        self.queries = 0
+
+    ### queue a query and wait for the reply; an error message if the ###
+    ### batch failed ###
+    def submit(self, v, k) :
+        request = [v, k, threading.Event(), None]
+        self.requests.put(request)
+        request[2].wait()
+        return request[3]
+
+    ### collect micro-batches until stopped ###
+    def runBatches(self) :
+        while (self.running) :
+            try :
+                batch = [self.requests.get(True, 0.1)]
+            except Queue.Empty :
+                continue
+            deadline = time.time() + self.maxLatency
+            while (len(batch) < self.batchSize) :
+                wait = deadline - time.time()
+                try :
+                    if (wait > 0) :
+                        batch.append(self.requests.get(True, wait))
+                    else :
+                        batch.append(self.requests.get(False))
+                except Queue.Empty :
+                    break
+            self.processBatch(batch)
+
+    ### answer a batch with one hashing pass ###
+    def processBatch(self, batch) :
+        pts = numpy.array([request[0] for request in batch])
+        ks = [request[1] for request in batch]
+        try :
+            results = self.index.queryBatch(pts, ks, self.probes)
+        except Exception, e :
+            print '-- batch failed: ', e
+            results = ['batch failed: ' + repr(e)] * len(batch)
+        for [request, result] in zip(batch, results) :
+            request[3] = result
+            request[2].set()
+        self.batches += 1
+        self.queries += len(batch)
+
+    ### serve until interrupted ###
+    def serve(self) :
+        if (os.path.exists(self.path)) :
+            os.unlink(self.path)
+        self.server = UnixServer(self.path, QueryHandler)
+        self.server.queryServer = self
+        self.running = True
+        batcher = threading.Thread(target=self.runBatches)
+        batcher.daemon = True
+        batcher.start()
+        try :
+            self.server.serve_forever()
+        finally :
+            self.running = False
+            self.server.server_close()
+            os.unlink(self.path)
+
+    ### stop serving (from another thread) ###
+    def shutdown(self) :
+        self.server.shutdown()
+
+### client: read exactly size bytes; IOError at end of stream ###
+def recvReply(sock, size) :
+    data = recvAll(sock, size)
+    if (data is None) :
+        raise IOError('connection closed by the server')
+    return data
+
+### client: k nearest neighbours of v; ids and distances; IOError on ###
+### an error reply ###
+def query(sock, v, k) :
+    v = numpy.asarray(v, dtype='<f8')
+    sock.sendall(struct.pack('<II', k, len(v)) + v.tostring())
+    [count] = struct.unpack('<I', recvReply(sock, 4))
+    if (count == ERROR) :
+        [size] = struct.unpack('<I', recvReply(sock, 4))
+        raise IOError('query failed: ' + recvReply(sock, size))
+    ids = numpy.frombuffer(recvReply(sock, 8 * count), dtype='<i8')
+    dist = numpy.frombuffer(recvReply(sock, 8 * count), dtype='<f8')
+    return [ids, dist]
+
+### load generator: clients x requests queries of random points ###
+def runLoad(path, points, clients, requests, k) :
+    latencies = [None] * clients
+
+    # one connection per client thread
+    def client(c) :
+        rng = numpy.random.RandomState(c)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(path)
+        lat = numpy.zeros(requests)
+        for r in range(requests) :
+            v = points[rng.randint(len(points))]
+            start = time.time()
+            query(sock, v, k)
+            lat[r] = time.time() - start
+        sock.close()
+        latencies[c] = lat
+
+    # run and report
+    start = time.time()
+    threads = [threading.Thread(target=client, args=(c,)) \
+        for c in range(clients)]
+    for t in threads :
+        t.start()
+    for t in threads :
+        t.join()
+    elapsed = time.time() - start
+    lat = numpy.concatenate(latencies) * 1000.0
+    return {'queries' : len(lat), 'seconds' : elapsed, \
+        'throughput' : len(lat) / elapsed, \
+        'p50_ms' : numpy.percentile(lat, 50), \
+        'p99_ms' : numpy.percentile(lat, 99)}
+
+### main ###
+if __name__ == '__main__':
+
+    # check args
+    args = sys.argv[1:]
+    nargs = len(args)
+    if (nargs < 3 or args[0] not in ['serve', 'load']) :
+        print '# usage: lsh_server.py serve index_file socket ' + \
+            '[batch_size] [max_latency_ms] [probes]'
+        print '#        lsh_server.py load index_file socket ' + \
+            '[clients] [requests] [k]'
+        sys.exit()
+    index = lsh_index.loadIndex(args[1])
+    path = args[2]
+
+    # server
+    if (args[0] == 'serve') :
+        batchSize = 64
+        if (nargs > 3) :
+            batchSize = int(args[3])
+        maxLatency = 0.001
+        if (nargs > 4) :
+            maxLatency = float(args[4]) / 1000.0
+        probes = 0
+        if (nargs > 5) :
+            probes = int(args[5])
+        print '# serving ', args[1], ' on ', path, '; batch = ', \
+            batchSize, '; latency = ', maxLatency, 's'
+        QueryServer(index, path, batchSize, maxLatency, probes).serve()
+
+    # load generator; query points from the index file
+    else :
+        clients = 8
+        if (nargs > 3) :
+            clients = int(args[3])
+        requests = 1000
+        if (nargs > 4) :
+            requests = int(args[4])
+        k = 10
+        if (nargs > 5) :
+            k = int(args[5])
+        result = runLoad(path, index.points, clients, requests, k)
+        print '# queries = ', result['queries'], '; throughput = ', \
+            result['throughput'], '/s; p50 = ', result['p50_ms'], \
+            'ms; p99 = ', result['p99_ms'], 'ms'
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+
+# Date: 2026-10-18
+# Author: agent <agent@local>
+# Description: Data-driven choice of the LSH parameters k, L and w.
+#
+# lsh_tune.py measures the distribution of query-to-point distances in a
+# sample of the data and uses the collision probability of the p-stable
+# hash (Ref. [1]) to search k, L and w: for every w and k the smallest L
+# that reaches the target recall at the radius is taken, and the query
+# cost (projections plus exact re-ranking of the expected candidates)
+# and the index memory are estimated for n points. The cheapest
+# configuration within the memory budget is returned and can be checked
+# against the sample with an index.
+#
+# References:
+#
+# 1. M. Datar, N. Immorlica, P. Indyk, V. Mirrokni, Locality-sensitive
+# hashing scheme based on p-stable distributions, SoCG 2004.
+#
+
+#####
+import sys
+import math
+import numpy
+import lsh
+import lsh_index
+
+### collision probability of one p-stable hash at distances c ###
+def collisionProbability(c, w) :
+    c = numpy.maximum(numpy.atleast_1d(c).astype(numpy.float), 1e-300)
+    t = w / c
+    erf = numpy.frompyfunc(math.erf, 1, 1)
+    cdf = 0.5 * (1.0 + erf(-t / math.sqrt(2.0)).astype(numpy.float))
+    p = 1.0 - 2.0 * cdf - \
+        2.0 / (math.sqrt(2.0 * math.pi) * t) * (1.0 - numpy.exp(-0.5 * t * t))
+    return numpy.clip(p, 0.0, 1.0)
+
+### distances from sampled queries to the other sample points ###
+def sampleDistances(sample, queries=100, seed=918273645) :
+    rng = numpy.random.RandomState(seed)
+    m = len(sample)
+    qids = rng.choice(m, min(queries, m), replace=False)
+    dist = []
+    for q in qids :
+        diff = sample - sample[q]
+        d = numpy.sqrt(numpy.einsum('ij,ij->i', diff, diff))
+        dist.append(numpy.delete(d, q))
+    return numpy.concatenate(dist)
+
+### estimates of all (w, k) configurations; list of dicts ###
+def getConfigurations(dist, d, n, radius, recall, ws=None, kmax=30, \
+        lmax=2048, maxMemory=None) :
+    if (ws is None) :
+        ws = [radius * f for f in [0.5, 1.0, 1.5, 2.0, 3.0, 4.0, 6.0, 8.0]]
+
+    # distances binned to quantiles; each bin stands for a share of points
+    qs = numpy.linspace(0.0, 1.0, 513)
+    edges = numpy.percentile(dist, 100.0 * qs)
+    mids = 0.5 * (edges[1:] + edges[:-1])
+    share = numpy.diff(qs)
+
+    configs = []
+    for w in ws :
+        p1 = float(collisionProbability(radius, w)[0])
+        pc = collisionProbability(mids, w)
+        for k in range(1, kmax + 1) :
+            # smallest L reaching the recall at the radius
+            pk = p1**k
+            if (pk <= 0.0) :
+                break
+            if (pk >= 1.0) :
+                l = 1
+            else :
+                l = math.ceil(math.log(1.0 - recall) / math.log1p(-pk))
+            if (l > lmax) :
+                break
+            l = max(int(l), 1)
+
+            # expected candidates, query cost (flops) and memory (bytes)
+            hit = 1.0 - (1.0 - pc**k)**l
+            candidates = n * float((share * hit).sum())
+            cost = l * k * d * 2 + candidates * d * 3 + l * math.log(n, 2)
+            memory = l * k * d * 8 + l * n * (4 + 8 + 8)
+            if (maxMemory is not None and memory > maxMemory) :
+                continue
+            configs.append({'w' : w, 'k' : k, 'l' : l, \
+                'recall' : 1.0 - (1.0 - pk)**l, 'candidates' : candidates, \
+                'cost' : cost, 'memory' : memory})
+    return configs
+
+### cheapest configuration for the sample; None if none qualifies ###
+def tuneParameters(sample, n, radius, recall=0.9, maxMemory=None, \
+        verbose=True) :
+    sample = numpy.asarray(sample, dtype=numpy.float)
+    dist = sampleDistances(sample)
+    configs = getConfigurations(dist, sample.shape[1], n, radius, recall, \
+        maxMemory=maxMemory)
+    if (verbose) :
+        print '# w\tk\tL\trecall\tcandidates\tcost\tmemory'
+        for c in configs :
+            print '%g\t%d\t%d\t%.4f\t%.1f\t%.0f\t%d' % (c['w'], c['k'], \
+                c['l'], c['recall'], c['candidates'], c['cost'], c['memory'])
+    if (len(configs) == 0) :
+        return None
+    return min(configs, key=lambda c : c['cost'])
+
+### measured recall of the neighbours within radius for a configuration ###
+def checkConfiguration(sample, config, radius, queries=100) :
+    sample = numpy.asarray(sample, dtype=numpy.float)
+    h = lsh.LocalitySensitiveHash(sample.shape[1], config['k'], \
+        config['l'], w=config['w'])
+    index = lsh_index.LocalitySensitiveHashIndex(h, sample)
+    found = 0
+    total = 0
+    for q in range(min(queries, len(sample))) :
+        diff = sample - sample[q]
+        near = numpy.flatnonzero(numpy.einsum('ij,ij->i', diff, diff) \
+            <= radius * radius)
+        near = near[near != q]
+        candidates = index.getQueryCandidates(sample[q])
+        found += len(numpy.intersect1d(near, candidates))
+        total += len(near)
+    if (total == 0) :
+        return None
+    return float(found) / total
+
+### main ###
+if __name__ == '__main__':
+
+    # check args
+    args = sys.argv[1:]
+    nargs = len(args)
+    if (nargs < 3) :
+        print '# usage: lsh_tune.py d n radius [recall] [sample]'
+        sys.exit()
+
+    # read input parameters
+    d = int(args[0]) # dimensions
+    n = int(args[1]) # number of points
+    radius = float(args[2])
+    recall = 0.9
+    if (nargs > 3) :
+        recall = float(args[3])
+    m = min(n, 5000)
+    if (nargs > 4) :
+        m = int(args[4])
+
+    # tune on a sample of the random points of lsh.py
+    pts = lsh.randomCoordinates(d, n)
+    sample = pts[numpy.random.RandomState(1).choice(n, m, replace=False)]
+    best = tuneParameters(sample, n, radius, recall)
+    if (best is None) :
+        print '# no configuration reaches the recall'
+        sys.exit()
+    print '# best: w = ', best['w'], '; k = ', best['k'], '; L = ', \
+        best['l'], '; cost = ', best['cost'], '; memory = ', best['memory']
+    measured = checkConfiguration(sample, best, radius)
+    print '# measured recall on the sample = ', measured
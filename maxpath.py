@@ -10,18 +10,37 @@ import sys
 import math
 import numpy
 import time
+import graph_loader
 
-# global variable(s)
-maxlevel = 0
-
-### grap traversal
-def traverse(node, edges, level) :
-    global maxlevel
-    if (level > maxlevel) :
-        maxlevel = level
-    for edge in [e for e in edges if e[1] == node] :
-        traverse(edge[0], edges, level + 1)
-    return
+### longest path (number of edges) from start along the references; ###
+### iterative depth-first search with memoized lengths; None on a cycle ###
+def getMaxLevel(start, indptr, indices) :
+    ptr = indptr.tolist()
+    refs = indices.tolist()
+    # unvisited = -2, on the path = -1, done = longest path length
+    depth = [-2] * (len(ptr) - 1)
+    depth[start] = -1
+    stack = [[start, ptr[start]]]
+    while (stack) :
+        top = stack[-1]
+        [node, pos] = top
+        if (pos < ptr[node + 1]) :
+            top[1] = pos + 1
+            child = refs[pos]
+            if (depth[child] == -1) :
+                return None
+            if (depth[child] == -2) :
+                depth[child] = -1
+                stack.append([child, ptr[child]])
+            continue
+        # all references done
+        level = 0
+        for child in refs[ptr[node]:ptr[node + 1]] :
+            if (depth[child] + 1 > level) :
+                level = depth[child] + 1
+        depth[node] = level
+        stack.pop()
+    return depth[start]
 
 ### main ###
 if __name__ == '__main__':
@@ -30,51 +49,32 @@ if __name__ == '__main__':
     args = sys.argv[1:] 
     nargs = len(args)
     if (nargs < 3) :
-        print '-- usage: maxpath.py node_file_name edge_file_name start_node'
+        print '-- usage: maxpath.py node_file_name edge_file_name ' + \
+            'start_node [cache_file_name]'
         sys.exit()
 
     # info
     print '-- maxpath.py:', args
     
-    # extract nodes
-    fn = args[0]
-    f = open(fn, 'r')
-    nodes = []
-    for line in f :
-        if (not line.startswith('#')) :
-            line = line.strip()
-            nodes.append(line)
-    f.close()
-    nodes = sorted(nodes)
-
-    # system size and the edge matrix
-    size = len(nodes)
-
-    # extract edges
-    fn = args[1]
-    f = open(fn, 'r')
-    edges = []
-    for line in f :
-        if (not line.startswith('#')) :
-            # edge
-            edge = line.strip().split('\t')
-            # exclude self-references
-            if (not edge[0] == edge[1]) :
-                edges.append(edge)
-    f.close()
-    edges = sorted(edges)
+    # nodes and edges (the compiled graph is cached if a file is given)
+    cache = None
+    if (nargs > 3) :
+        cache = args[3]
+    graph = graph_loader.loadGraph(args[0], args[1], cache)
 
     # info
-    print '-- number of nodes =', len(nodes)
-    print '-- number of edges =',len(edges)
+    graph.printInfo()
 
     # iterate from start node
     node = args[2]
-    if (not node in nodes) :
+    if (not node in graph.ids) :
         print '-- node ', node, ' not in the list, exiting...'
         sys.exit()
 
     # compute
-    level = 0
-    traverse(node, edges, level)
+    [indptr, indices] = graph.references
+    maxlevel = getMaxLevel(graph.ids[node], indptr, indices)
+    if (maxlevel is None) :
+        print '-- not an ADG (asyclic directed graph) from ', node
+        sys.exit()
     print '-- start node = ', node, '; max level = ', maxlevel
@@ -0,0 +1,301 @@
+#!/usr/bin/env python
+
+# Date: 2026-10-18
+# Author: agent <agent@local>
+# Description: Newman-Ziff percolation sweeps on top of union_find.py
+# (Ref. [1]).
+#
+# percolation.py occupies the bonds (or sites) of a lattice or of any
+# edge list one at a time in random order and joins the clusters with the
+# weighted union-find, so that every addition costs nearly constant time.
+# After every addition it records the size of the largest cluster, the
+# mean size of the other clusters (sum of s^2 over the clusters except
+# the largest, divided by their number of nodes) and whether a cluster
+# spans between two node sets (the first and last layers of a lattice).
+# Independent realisations run in a process pool; the curves are averaged
+# per occupation number and can be convolved with the binomial
+# distribution into curves of the occupation probability p.
+#
+# References:
+#
+# 1. M. E. J. Newman1 and R. M. Ziff Phys. Rev. E 64, 016706 (2001)
+#
+
+#####
+import sys
+import time
+import array
+import multiprocessing
+import numpy
+import union_find
+
+# worker state, set once per process by initWorker
+workerGraph = None
+
+### bonds of a lattice (nodes numbered in C order); axis 0 is open, ###
+### the other axes wrap around if periodic ###
+def latticeBonds(shape, periodic=False) :
+    shape = tuple(shape)
+    ids = numpy.arange(int(numpy.prod(shape)), dtype=numpy.int64)
+    ids = ids.reshape(shape)
+    src = []
+    dst = []
+    for axis in range(len(shape)) :
+        upper = [slice(None)] * len(shape)
+        lower = [slice(None)] * len(shape)
+        upper[axis] = slice(0, -1)
+        lower[axis] = slice(1, None)
+        src.append(ids[tuple(upper)].ravel())
+        dst.append(ids[tuple(lower)].ravel())
+        if (periodic and axis > 0 and shape[axis] > 2) :
+            src.append(numpy.take(ids, -1, axis=axis).ravel())
+            dst.append(numpy.take(ids, 0, axis=axis).ravel())
+    return [numpy.concatenate(src), numpy.concatenate(dst)]
+
+### nodes of the first and last layers of a lattice along axis 0 ###
+def latticeFaces(shape) :
+    shape = tuple(shape)
+    ids = numpy.arange(int(numpy.prod(shape)), dtype=numpy.int64)
+    ids = ids.reshape(shape)
+    return [ids[0].ravel(), ids[-1].ravel()]
+
+### spanning flags: 1 for top, 2 for bottom nodes ###
+def getFlags(n, top, bottom) :
+    flags = array.array('b', [0]) * n
+    if (top is not None) :
+        for i in top :
+            flags[int(i)] |= 1
+        for i in bottom :
+            flags[int(i)] |= 2
+    return flags
+
+### bond percolation: occupy the edges in the given order ###
+### returns largest, mean and spanning curves of length m + 1 ###
+def bondPercolation(n, src, dst, order, top=None, bottom=None) :
+    m = len(order)
+    uf = union_find.UnionFind(n)
+    find = uf.find
+    p = uf.store
+    flags = getFlags(n, top, bottom)
+    src = numpy.asarray(src)[order].tolist()
+    dst = numpy.asarray(dst)[order].tolist()
+    largest = array.array('l', [0]) * (m + 1)
+    mean = array.array('d', [0.0]) * (m + 1)
+    spans = array.array('b', [0]) * (m + 1)
+
+    # all nodes start as clusters of one
+    smax = min(n, 1)
+    s2 = n
+    spanning = 0
+    for i in range(n) :
+        if (flags[i] == 3) :
+            spanning = 1
+    largest[0] = smax
+    if (n > smax) :
+        mean[0] = float(s2 - smax * smax) / (n - smax)
+    spans[0] = spanning
+
+    for e in xrange(m) :
+        r1 = find(src[e])
+        r2 = find(dst[e])
+        if (r1 != r2) :
+            # union by size, aggregates follow the root
+            if (p[r1] > p[r2]) :
+                [r1, r2] = [r2, r1]
+            a = -p[r1]
+            b = -p[r2]
+            p[r1] -= b
+            p[r2] = r1
+            s2 += 2 * a * b
+            if (a + b > smax) :
+                smax = a + b
+            f = flags[r1] | flags[r2]
+            flags[r1] = f
+            if (f == 3) :
+                spanning = 1
+        largest[e + 1] = smax
+        if (n > smax) :
+            mean[e + 1] = float(s2 - smax * smax) / (n - smax)
+        spans[e + 1] = spanning
+    return [numpy.frombuffer(largest, dtype=numpy.int_).copy(), \
+        numpy.frombuffer(mean).copy(), \
+        numpy.frombuffer(spans, dtype=numpy.int8).copy()]
+
+### site percolation: occupy the nodes in the given order ###
+### returns largest, mean and spanning curves of length n + 1 ###
+def sitePercolation(n, src, dst, order, top=None, bottom=None) :
+    # neighbours in CSR form
+    src = numpy.asarray(src, dtype=numpy.int64)
+    dst = numpy.asarray(dst, dtype=numpy.int64)
+    heads = numpy.concatenate([src, dst])
+    tails = numpy.concatenate([dst, src])
+    sort = numpy.argsort(heads, kind='mergesort')
+    indptr = numpy.zeros(n + 1, dtype=numpy.int64)
+    numpy.cumsum(numpy.bincount(heads, minlength=n), out=indptr[1:])
+    indptr = indptr.tolist()
+    nbrs = tails[sort].tolist()
+
+    uf = union_find.UnionFind(n)
+    find = uf.find
+    p = uf.store
+    flags = getFlags(n, top, bottom)
+    occupied = array.array('b', [0]) * n
+    order = numpy.asarray(order).tolist()
+    largest = array.array('l', [0]) * (n + 1)
+    mean = array.array('d', [0.0]) * (n + 1)
+    spans = array.array('b', [0]) * (n + 1)
+
+    smax = 0
+    s2 = 0
+    spanning = 0
+    for o in xrange(len(order)) :
+        i = order[o]
+        occupied[i] = 1
+        s2 += 1
+        if (smax < 1) :
+            smax = 1
+        if (flags[i] == 3) :
+            spanning = 1
+        for j in nbrs[indptr[i]:indptr[i+1]] :
+            if (not occupied[j]) :
+                continue
+            r1 = find(i)
+            r2 = find(j)
+            if (r1 == r2) :
+                continue
+            if (p[r1] > p[r2]) :
+                [r1, r2] = [r2, r1]
+            a = -p[r1]
+            b = -p[r2]
+            p[r1] -= b
+            p[r2] = r1
+            s2 += 2 * a * b
+            if (a + b > smax) :
+                smax = a + b
+            f = flags[r1] | flags[r2]
+            flags[r1] = f
+            if (f == 3) :
+                spanning = 1
+        largest[o + 1] = smax
+        if (o + 1 > smax) :
+            mean[o + 1] = float(s2 - smax * smax) / (o + 1 - smax)
+        spans[o + 1] = spanning
+    return [numpy.frombuffer(largest, dtype=numpy.int_).copy(), \
+        numpy.frombuffer(mean).copy(), \
+        numpy.frombuffer(spans, dtype=numpy.int8).copy()]
+
+### worker start-up: keep the graph ###
+def initWorker(graph) :
+    global workerGraph
+    workerGraph = graph
+
+### one realisation with its own random order ###
+def runRealisation(task) :
+    [kind, seed] = task
+    [n, src, dst, top, bottom] = workerGraph
+    rng = numpy.random.RandomState(seed)
+    if (kind == 'bond') :
+        order = rng.permutation(len(src))
+        return bondPercolation(n, src, dst, order, top, bottom)
+    order = rng.permutation(n)
+    return sitePercolation(n, src, dst, order, top, bottom)
+
+### averaged curves of a number of realisations (kind: bond or site) ###
+def percolationSweep(kind, n, src, dst, realisations, top=None, \
+        bottom=None, workers=None, seed=918273645) :
+    if (kind not in ['bond', 'site']) :
+        raise ValueError('unknown percolation kind: ' + str(kind))
+    graph = [n, numpy.asarray(src, dtype=numpy.int64), \
+        numpy.asarray(dst, dtype=numpy.int64), top, bottom]
+    tasks = [[kind, seed + r] for r in range(realisations)]
+    if (workers == 1) :
+        initWorker(graph)
+        results = map(runRealisation, tasks)
+    else :
+        pool = multiprocessing.Pool(workers, initWorker, (graph,))
+        results = pool.imap_unordered(runRealisation, tasks)
+
+    # accumulate as the realisations finish
+    sums = None
+    for result in results :
+        if (sums is None) :
+            sums = [numpy.zeros(len(curve)) for curve in result]
+        for [total, curve] in zip(sums, result) :
+            total += curve
+    if (workers != 1) :
+        pool.close()
+        pool.join()
+    curves = {'largest' : sums[0] / realisations, \
+        'mean' : sums[1] / realisations, \
+        'spanning' : sums[2] / realisations}
+    if (top is None) :
+        curves['spanning'][:] = numpy.nan
+    return curves
+
+### value of a curve over occupation numbers at occupation probability p ###
+def convolveCurve(curve, p) :
+    m = len(curve) - 1
+    if (p <= 0.0) :
+        return curve[0]
+    if (p >= 1.0) :
+        return curve[m]
+    k = numpy.arange(m + 1)
+    logc = numpy.zeros(m + 1)
+    logc[1:] = numpy.cumsum(numpy.log(m - k[1:] + 1.0) - numpy.log(k[1:]))
+    logw = logc + k * numpy.log(p) + (m - k) * numpy.log1p(-p)
+    w = numpy.exp(logw - logw.max())
+    return (w * curve).sum() / w.sum()
+
+### write the curves as tab-separated columns ###
+def writeCurves(fn, curves, nodes) :
+    f = open(fn, 'w')
+    m = len(curves['largest']) - 1
+    f.write('# occupied\tfraction\tlargest\tmean\tspanning\n')
+    for o in range(m + 1) :
+        f.write('%d\t%.8g\t%.8g\t%.8g\t%.8g\n' % (o, float(o) / max(m, 1), \
+            curves['largest'][o] / nodes, curves['mean'][o], \
+            curves['spanning'][o]))
+    f.close()
+
+### main ###
+if __name__ == '__main__':
+
+    # check args
+    args = sys.argv[1:]
+    nargs = len(args)
+    if (nargs < 4 or args[0] not in ['bond', 'site']) :
+        print '# usage: percolation.py bond|site size[xsize...] ' + \
+            'realisations out_file [workers]'
+        print '#        percolation.py bond|site edge_file ' + \
+            'realisations out_file [workers]'
+        sys.exit()
+    kind = args[0]
+    realisations = int(args[2])
+    fn = args[3]
+    workers = None
+    if (nargs > 4) :
+        workers = int(args[4])
+
+    # lattice (e.g. 256x256) or edge list file (two node ids per line)
+    try :
+        shape = [int(x) for x in args[1].split('x')]
+    except ValueError :
+        shape = None
+    if (shape is not None) :
+        [src, dst] = latticeBonds(shape)
+        [top, bottom] = latticeFaces(shape)
+        n = int(numpy.prod(shape))
+    else :
+        edges = numpy.loadtxt(args[1], dtype=numpy.int64, ndmin=2)
+        [src, dst] = [edges[:, 0], edges[:, 1]]
+        [top, bottom] = [None, None]
+        n = int(edges.max()) + 1
+    print '# ', kind, ' percolation; nodes = ', n, '; edges = ', len(src), \
+        '; realisations = ', realisations
+
+    # sweep
+    start = time.time()
+    curves = percolationSweep(kind, n, src, dst, realisations, top, bottom, \
+        workers)
+    writeCurves(fn, curves, n)
+    print '# time = ', (time.time() - start), 's'
@@ -0,0 +1,260 @@
+#!/usr/bin/env python
+
+# Date: 2026-10-18
+# Author: agent <agent@local>
+# Description: Dependency-ordered task scheduler on top of toposort.py.
+#
+# scheduler.py runs one task per node of a graph read by graph_loader.py
+# (e.g. loading the tables of the toposort.py sample: City, then Customer,
+# then SalesOrder) so that a node starts as soon as all the nodes it
+# references have finished; there are no level barriers. Ready nodes are
+# dispatched to a thread or process pool whose size is the concurrency
+# limit. A task is a shell command or a Python callable (taking no
+# arguments; module-level or functools.partial for process pools, which
+# is checked up front). A task fails on a non-zero exit status, on any
+# exception (SystemExit included) and when the pool cannot run it; the
+# nodes depending on it (directly or not) are then skipped.
+# The reports give the level, status and timing of every node, and the
+# critical path: the chain of dependent tasks with the largest total run
+# time, which bounds the run time whatever the concurrency.
+#
+# Usage: scheduler.py node_file edge_file task_file [workers]
+#        [thread|process] [report_prefix]
+#
+# The task file has lines node <tab> command; nodes without a command
+# finish at once.
+#
+
+#####
+import sys
+import time
+import pickle
+import subprocess
+import collections
+import Queue
+import multiprocessing
+import multiprocessing.pool
+import numpy
+import graph_loader
+import toposort
+
+### run the task of a node; [node, start, end, status, error] ###
+def runTask(task) :
+    [node, action] = task
+    start = time.time()
+    status = 'done'
+    error = ''
+    try :
+        if (isinstance(action, basestring)) :
+            code = subprocess.call(action, shell=True)
+            if (code != 0) :
+                status = 'failed'
+                error = 'exit status ' + str(code)
+        elif (action is not None) :
+            action()
+    except BaseException, e :
+        status = 'failed'
+        error = repr(e)
+    return [node, start, time.time(), status, error]
+
+### run a task pickled by the scheduler (process pools); see runTask ###
+def runPickled(task) :
+    [node, data] = task
+    try :
+        return runTask(pickle.loads(data))
+    except BaseException, e :
+        now = time.time()
+        return [node, now, now, 'failed', repr(e)]
+
+### Scheduler ###
+class Scheduler :
+
+    ### constructor; actions maps node names to commands or callables ###
+    def __init__(self, graph, actions, workers=4, processes=False) :
+        self.graph = graph
+        self.actions = actions
+        self.workers = workers
+        self.processes = processes
+        for name in actions :
+            if (name not in graph.ids) :
+                raise ValueError('task for an unknown node: ' + name)
+            # process pools pickle the callables
+            if (processes and not isinstance(actions[name], basestring)) :
+                try :
+                    pickle.dumps(actions[name], pickle.HIGHEST_PROTOCOL)
+                except Exception, e :
+                    raise ValueError('task of ' + name + \
+                        ' cannot be sent to a process pool: ' + repr(e))
+
+        # levels; also checks that the graph is acyclic
+        [indptr, indices] = graph.dependents
+        indeg = graph.indeg.copy()
+        order = toposort.getTopologicalSortingSparse(indptr, indices, indeg)
+        if (indeg.sum() > 0) :
+            raise ValueError('not an ADG (asyclic directed graph)')
+        self.order = [node for [node, level] in order]
+        self.levels = [0] * graph.size
+        for [node, level] in order :
+            self.levels[node] = level
+        self.results = None
+
+    ### run all tasks; returns the results per node (None if skipped) ###
+    def run(self) :
+        graph = self.graph
+        if (self.processes) :
+            pool = multiprocessing.Pool(self.workers)
+        else :
+            pool = multiprocessing.pool.ThreadPool(self.workers)
+        [indptr, indices] = graph.dependents
+        ptr = indptr.tolist()
+        refs = indices.tolist()
+        remaining = graph.indeg.tolist()
+        ready = collections.deque([n for n in range(graph.size) \
+            if remaining[n] == 0])
+        finished = Queue.Queue()
+        results = [None] * graph.size
+        running = 0
+        self.start = time.time()
+
+        # dispatch ready nodes, release dependents as tasks finish
+        while (ready or running) :
+            while (ready) :
+                node = ready.popleft()
+                task = [node, self.actions.get(graph.names[node])]
+                running += 1
+                if (not self.processes) :
+                    pool.apply_async(runTask, (task,), callback=finished.put)
+                    continue
+                # the task is pickled here, so that a task the pool could
+                # not send fails at once; every job sent returns a result
+                # through the callback
+                try :
+                    data = pickle.dumps(task, pickle.HIGHEST_PROTOCOL)
+                except Exception, e :
+                    now = time.time()
+                    finished.put([node, now, now, 'failed', repr(e)])
+                    continue
+                pool.apply_async(runPickled, ([node, data],), \
+                    callback=finished.put)
+            result = finished.get()
+            running -= 1
+            node = result[0]
+            results[node] = result
+            if (result[3] != 'done') :
+                print '-- task failed: ', graph.names[node], '; ', result[4]
+                continue
+            for mm in refs[ptr[node]:ptr[node+1]] :
+                remaining[mm] -= 1
+                if (remaining[mm] == 0) :
+                    ready.append(mm)
+        pool.close()
+        pool.join()
+        self.results = results
+        return results
+
+    ### run time of the node (0 if not run) ###
+    def getDuration(self, node) :
+        result = self.results[node]
+        if (result is None) :
+            return 0.0
+        return result[2] - result[1]
+
+    ### nodes of the critical path (in run order) and its total run time ###
+    def getCriticalPath(self) :
+        [indptr, indices] = self.graph.references
+        ptr = indptr.tolist()
+        refs = indices.tolist()
+        total = [0.0] * self.graph.size
+        prev = [-1] * self.graph.size
+        for node in self.order :
+            best = -1
+            for mm in refs[ptr[node]:ptr[node+1]] :
+                if (best < 0 or total[mm] > total[best]) :
+                    best = mm
+            prev[node] = best
+            if (best >= 0) :
+                total[node] = total[best]
+            total[node] += self.getDuration(node)
+        if (self.graph.size == 0) :
+            return [[], 0.0]
+        node = int(numpy.argmax(total))
+        path = []
+        while (node >= 0) :
+            path.insert(0, node)
+            node = prev[node]
+        return [path, total[path[-1]]]
+
+    ### per-node report: name, level, status, start, end, seconds ###
+    def writeTimings(self, fn) :
+        f = open(fn, 'w')
+        f.write('# node\tlevel\tstatus\tstart\tend\tseconds\n')
+        for node in self.order :
+            result = self.results[node]
+            name = self.graph.names[node]
+            if (result is None) :
+                f.write('%s\t%d\tskipped\t\t\t\n' % (name, self.levels[node]))
+                continue
+            f.write('%s\t%d\t%s\t%.3f\t%.3f\t%.3f\n' % (name, \
+                self.levels[node], result[3], result[1] - self.start, \
+                result[2] - self.start, result[2] - result[1]))
+        f.close()
+
+    ### critical path report: name, seconds, cumulative seconds ###
+    def writeCriticalPath(self, fn) :
+        [path, total] = self.getCriticalPath()
+        f = open(fn, 'w')
+        f.write('# node\tseconds\tcumulative\n')
+        cumulative = 0.0
+        for node in path :
+            cumulative += self.getDuration(node)
+            f.write('%s\t%.3f\t%.3f\n' % (self.graph.names[node], \
+                self.getDuration(node), cumulative))
+        f.close()
+        return total
+
+### commands per node from a task file (node <tab> command) ###
+def readTasks(fn) :
+    actions = {}
+    f = open(fn, 'r')
+    for line in f :
+        if (not line.startswith('#') and line.strip()) :
+            [node, command] = line.rstrip('\n').split('\t', 1)
+            actions[node.strip()] = command
+    f.close()
+    return actions
+
+### main ###
+if __name__ == '__main__':
+
+    # check args
+    args = sys.argv[1:]
+    nargs = len(args)
+    if (nargs < 3) :
+        print '-- usage: scheduler.py node_file edge_file task_file ' + \
+            '[workers] [thread|process] [report_prefix]'
+        sys.exit()
+
+    # read input parameters
+    graph = graph_loader.loadGraph(args[0], args[1])
+    actions = readTasks(args[2])
+    workers = 4
+    if (nargs > 3) :
+        workers = int(args[3])
+    processes = (nargs > 4 and args[4] == 'process')
+    prefix = 'scheduler'
+    if (nargs > 5) :
+        prefix = args[5]
+    graph.printInfo()
+
+    # run
+    scheduler = Scheduler(graph, actions, workers, processes)
+    start = time.time()
+    results = scheduler.run()
+    elapsed = time.time() - start
+    scheduler.writeTimings(prefix + '.timings.txt')
+    total = scheduler.writeCriticalPath(prefix + '.critical.txt')
+    failed = sum([1 for r in results if r is not None and r[3] != 'done'])
+    skipped = sum([1 for r in results if r is None])
+    print '-- run time =', int(round(elapsed * 1000)), 'ms.'
+    print '-- critical path =', int(round(total * 1000)), 'ms.'
+    print '-- failed =', failed, '; skipped =', skipped
@@ -7,6 +7,8 @@
 #####
 import sys
 import math
+import time
+import array
 import numpy
 
 ### Stack ###
@@ -40,28 +42,112 @@ class Stack :
     def empty(self) :
         return (self.idx == 0)
 
+### typed stack over an array of C values; capacity doubles when full ###
+class TypedStack :
+    ### constructor; dtype is a numpy dtype with an array typecode ###
+    def __init__(self, capacity=16, dtype=numpy.int_) :
+        self.dtype = numpy.dtype(dtype)
+        self.code = self.dtype.char
+        if (self.code not in 'bBhHiIlLfd') :
+            raise ValueError('TypedStack; unsupported dtype: ' + str(dtype))
+        self.idx = 0
+        self.store = array.array(self.code, [0]) * max(capacity, 1)
+        self.buf = numpy.frombuffer(self.store, dtype=self.dtype)
+
+    ### reset ###
+    def reset(self) :
+        self.idx = 0
+
+    ### room for size values ###
+    def reserve(self, size) :
+        capacity = len(self.store)
+        if (size <= capacity) :
+            return
+        while (capacity < size) :
+            capacity *= 2
+        # copied rather than extended in place (see view)
+        store = array.array(self.code, [0]) * capacity
+        store[:self.idx] = self.store[:self.idx]
+        self.store = store
+        self.buf = numpy.frombuffer(self.store, dtype=self.dtype)
+
+    ### push ###
+    def push(self, i) :
+        if (self.idx == len(self.store)) :
+            self.reserve(self.idx + 1)
+        self.store[self.idx] = i
+        self.idx += 1
+
+    ### push the values of a sequence (or numpy array) in order ###
+    def push_many(self, values) :
+        values = numpy.asarray(values, dtype=self.dtype).ravel()
+        self.reserve(self.idx + len(values))
+        self.buf[self.idx:self.idx+len(values)] = values
+        self.idx += len(values)
+
+    ### pop ###
+    def pop(self) :
+        if (self.idx == 0) :
+            raise IndexError('TypedStack; pop from empty stack')
+        self.idx -= 1
+        return self.store[self.idx]
+
+    ### pop the top m values; returned (as a copy) in push order ###
+    def pop_many(self, m) :
+        if (m > self.idx) :
+            raise IndexError('TypedStack; pop of ' + str(m) + \
+                ' values from ' + str(self.idx))
+        self.idx -= m
+        return self.buf[self.idx:self.idx+m].copy()
+
+    ### the contents without copying; the view shares memory with the ###
+    ### stack until it grows, then it keeps the old contents (copy) ###
+    def view(self) :
+        return self.buf[:self.idx]
+
+    ### number of values ###
+    def size(self) :
+        return self.idx
+
+    ### check if empty ###
+    def empty(self) :
+        return (self.idx == 0)
+
+### pushes per second of n pushes (then n pops) into stack s ###
+def benchmark(s, n) :
+    push = s.push
+    start = time.time()
+    for i in xrange(n) :
+        push(i)
+    pushes = n / (time.time() - start)
+    pop = s.pop
+    start = time.time()
+    for i in xrange(n) :
+        pop()
+    pops = n / (time.time() - start)
+    return [pushes, pops]
+
 ### main ###
-#if __name__ == '__main__':
-#
-#    # check args
-#    args = sys.argv[1:] 
-#    nargs = len(args)
-#    if (nargs < 1) :
-#        print '# usage: stack.py n'
-#        sys.exit()
-#
-#    # setup
-#    n = int(args[0])
-#    s = Stack(n)
-#
-#    # pushing
-#    for i in range(2 * n) :
-#        v = i + 1
-#        print 'push; i = ', i, '; v = ', v
-#        s.push(v)
-# 
-#    # popping
-#    while (s.empty() == False) :
-#        j = s.pop()
-#        print 'pop; ', j
-       
+if __name__ == '__main__':
+
+    # check args
+    args = sys.argv[1:] 
+    nargs = len(args)
+    if (nargs < 1) :
+        print '# usage: stack.py n'
+        sys.exit()
+
+    # setup
+    n = int(args[0])
+
+    # pushing and popping, starting from an empty stack
+    [pushes, pops] = benchmark(Stack(1), n)
+    print '# Stack: pushes/s = ', pushes, '; pops/s = ', pops
+    [pushes, pops] = benchmark(TypedStack(1), n)
+    print '# TypedStack: pushes/s = ', pushes, '; pops/s = ', pops
+    s = TypedStack(1)
+    start = time.time()
+    s.push_many(numpy.arange(n))
+    s.pop_many(n)
+    print '# TypedStack.push_many/pop_many: values/s = ', \
+        n / (time.time() - start)
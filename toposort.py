@@ -5,7 +5,7 @@
 # Description: Kahn algorithm - topological sorting
 #              Kahn algorithm enhanced
 #              Depth first algorithm
-# Usage:       toposort.py node_file_name edge_file_name;
+# Usage:       toposort.py node_file_name edge_file_name [cache_file_name];
 #
 # Sample:      Sample input data (tab-separated files edges.txt, nodes.txt)
 #              below.
@@ -34,9 +34,12 @@ import sys
 import math
 import numpy
 import time
+import collections
+import graph_loader
 
 # Kahn algorithm enhanced with level information. 
 def getTopologicalSortingLevel(matrix) :
+    size = len(matrix)
     nxt = 0
     slist = []
     for i in range(size) :
@@ -65,6 +68,7 @@ def getTopologicalSortingLevel(matrix) :
 
 # Kahn algorithm. 
 def getTopologicalSortingKahn(matrix) :
+    size = len(matrix)
     slist = []
     for i in range(size) :
         refs = matrix[i].sum()
@@ -86,6 +90,33 @@ def getTopologicalSortingKahn(matrix) :
     # done
     return llist
 
+# Kahn algorithm with level information on the sparse adjacency of
+# graph_loader.Graph (dependents and indeg), O(V+E);
+# same order and levels as getTopologicalSortingLevel. The edges removed
+# are taken off indeg: a non-zero sum afterwards means a cycle.
+def getTopologicalSortingSparse(indptr, indices, indeg) :
+    ptr = indptr.tolist()
+    refs = indices.tolist()
+    deg = indeg.tolist()
+    slist = collections.deque()
+    for i in range(len(deg)) :
+        if (deg[i] == 0) :
+            slist.append([i,0])
+    llist = []
+
+    # topological sort algorithm
+    while (slist) :
+        [nn, cur] = slist.pop()
+        llist.append([nn,cur])
+        for mm in refs[ptr[nn]:ptr[nn+1]] :
+            # remove edge
+            deg[mm] -= 1
+            if (deg[mm] == 0) :
+                slist.appendleft([mm, cur + 1])
+    # done
+    indeg[:] = deg
+    return llist
+
 # Depth-first algorithm 
 def getTopologicalSortingDepthFirst(matrix, dbg) :
     
@@ -138,7 +169,8 @@ if __name__ == '__main__':
     args = sys.argv[1:] 
     nargs = len(args)
     if (nargs < 2) :
-        print '-- usage: toposort.py node_file_name edge_file_name'
+        print '-- usage: toposort.py node_file_name edge_file_name ' + \
+            '[cache_file_name]'
         sys.exit()
 
     # info
@@ -147,55 +179,28 @@ if __name__ == '__main__':
     # timing
     start = int(round(time.time() * 1000))
        
-    # extract nodes
-    fn = args[0]
-    f = open(fn, 'r')
-    nodes = []
-    for line in f :
-        if (not line.startswith('#')) :
-            line = line.strip()
-            nodes.append(line)
-    f.close()
-    nodes = sorted(nodes)
-
-    # system size and the edge matrix
-    size = len(nodes)
-    matrix = numpy.zeros([size, size], dtype=numpy.int)
-
-    # extract edges
-    fn = args[1]
-    f = open(fn, 'r')
-    edges = []
-    for line in f :
-        if (not line.startswith('#')) :
-            # edge
-            edge = line.strip().split('\t')
-            # exclude self-references
-            if (len(edge) > 1 and not edge[0] == edge[1]) :
-                edges.append(edge)
-    f.close()
-    edges = sorted(edges)
-
-    # prepare the edge matrix
-    for edge in edges :
-        efrom = nodes.index(edge[1])
-        eto = nodes.index(edge[0])
-        matrix[efrom][eto] = 1
+    # nodes and edges (the compiled graph is cached if a file is given)
+    cache = None
+    if (nargs > 2) :
+        cache = args[2]
+    graph = graph_loader.loadGraph(args[0], args[1], cache)
+    nodes = graph.names
+    [indptr, indices] = graph.dependents
+    indeg = graph.indeg.copy()
 
     # timing
-    print '-- number of nodes =', len(nodes)
-    print '-- number of edges =',len(edges)
+    graph.printInfo()
     end = int(round(time.time() * 1000))
     print '-- read time =', (end-start), 'ms.'
 
     # sorting topologically
     start = int(round(time.time() * 1000))
-    srtd = getTopologicalSortingLevel(matrix)
+    srtd = getTopologicalSortingSparse(indptr, indices, indeg)
     end = int(round(time.time() * 1000))
     print '-- computation time =', (end-start), 'ms.'
     
     # done sorting
-    cnt = matrix.sum()
+    cnt = indeg.sum()
     if (cnt > 0) :
         print '-- not an ADG (asyclic directed graph)'
         print '-- number of edges remaining = ', cnt
@@ -203,6 +208,3 @@ if __name__ == '__main__':
         print '-- list of nodes in topological order:'
         for [node, lvl] in srtd :
             print lvl, nodes[node]
-
-
-
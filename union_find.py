@@ -12,27 +12,31 @@
 
 #####
 import sys
+import os
+import time
+import csv
+import array
 import numpy
-import stack
 
 ### union find with weighting and path compression ###
 class UnionFind :
     ### constructor ###
     def __init__(self, number_points):
         self.n = number_points
-        self.ptr = numpy.zeros((self.n), dtype=numpy.int)
-        self.reset()
-        self.stck = stack.Stack(100)
+        # parent store: array of C longs (root: -size); ptr is a numpy
+        # view of the same memory for the vectorized methods
+        self.store = array.array('l', [-1]) * self.n
+        self.ptr = numpy.frombuffer(self.store, dtype=numpy.int_)
+        self.edgeBlock = 2**24 # edges per hooking pass in union_many
 
     ### reset ###
     def reset(self) :
         # reset pointer array
-        for i in range(self.n):
-            self.ptr[i] = -1
+        self.ptr[:] = -1
 
     ### check if root ###
     def root(self, i) :
-        return (self.ptr[i] < 0)
+        return (self.store[i] < 0)
 
     ### find method ###
     def find(self, i) :
@@ -43,32 +47,18 @@ class UnionFind :
             msg = 'UnionFind(' + sn + '); index out of bounds: ' + si
             raise LookupError(msg)
 
-        # check if root
-        if (self.ptr[i] < 0) :
-            return i
-
-        # iterate to root; store path to stack
-        cnt = 0
-        self.stck.reset()
-        j = self.ptr[i]
-        while j >= 0 :
-            ri = j
-            self.stck.push(ri)
-            j = self.ptr[ri]
-            cnt += 1
-            if (cnt > 100) :
-                print 'maxiter exceeded'
-                return -101010101
-        r = ri
-
-        # iterate back to 'i' and point nodes to root
-        while (self.stck.empty() == False) :
-            j = self.stck.pop()
-            if (j != r) :
-                self.ptr[j] = r
-
-        # done
-        return r
+        # path halving: point every other node on the path to its
+        # grandparent while walking to the root (no length limit)
+        p = self.store
+        while (True) :
+            j = p[i]
+            if (j < 0) :
+                return i
+            g = p[j]
+            if (g < 0) :
+                return j
+            p[i] = g
+            i = g
 
     ### union method ###
     def union(self, i, j) :
@@ -77,50 +67,433 @@ class UnionFind :
         r2 = self.find(j);
 
         # if r1 and r2 differ, point smaller to larger
+        p = self.store
         if (r1 == r2) :
             return r1; 
-        if (self.ptr[r1] > self.ptr[r2]) :
-            self.ptr[r2] += self.ptr[r1]; 
-            self.ptr[r1] = r2; 
+        if (p[r1] > p[r2]) :
+            p[r2] += p[r1]; 
+            p[r1] = r2; 
             r1 = r2; 
         else :
-            self.ptr[r1] += self.ptr[r2]; 
-            self.ptr[r2] = r1; 
+            p[r1] += p[r2]; 
+            p[r2] = r1; 
 
         # done
         return r1; 
  
+    ### union of the edges (src[e], dst[e]); returns the root of every ###
+    ### node (the components are those of union() called per edge) ###
+    def union_many(self, src, dst) :
+        # check bounds
+        src = numpy.asarray(src, dtype=numpy.int64).ravel()
+        dst = numpy.asarray(dst, dtype=numpy.int64).ravel()
+        if (len(src) != len(dst)) :
+            raise ValueError('UnionFind; src and dst differ in length')
+        for e in [src, dst] :
+            if (len(e) > 0 and (e.min() < 0 or e.max() >= self.n)) :
+                bad = e[(e < 0) | (e >= self.n)][0]
+                msg = 'UnionFind(' + str(self.n) + '); ' + \
+                    'index out of bounds: ' + str(bad)
+                raise LookupError(msg)
+
+        # parents with roots pointing to themselves, fully compressed
+        parent = self.labels()
+
+        # hooking rounds over the edges in blocks: every root hooks to the
+        # smallest root it shares an edge with, then pointer jumping
+        for start in range(0, len(src), self.edgeBlock) :
+            u = parent[src[start:start+self.edgeBlock]]
+            v = parent[dst[start:start+self.edgeBlock]]
+            while (True) :
+                cross = (u != v)
+                u = u[cross]
+                v = v[cross]
+                if (len(u) == 0) :
+                    break
+                numpy.minimum.at(parent, numpy.maximum(u, v), \
+                    numpy.minimum(u, v))
+                parent = compress(parent)
+                u = parent[u]
+                v = parent[v]
+
+        # weights back into ptr: flat trees, roots hold -size
+        sizes = numpy.bincount(parent, minlength=self.n)
+        roots = (parent == numpy.arange(self.n))
+        self.ptr[:] = parent
+        self.ptr[roots] = -sizes[roots]
+
+        # done
+        return parent
+
+    ### root of every node; flattens all trees in one vectorized pass ###
+    def labels(self) :
+        parent = numpy.array(self.ptr, dtype=numpy.int64)
+        roots = (parent < 0)
+        parent[roots] = numpy.flatnonzero(roots)
+        parent = compress(parent)
+        self.ptr[~roots] = parent[~roots]
+        return parent
+
+    ### roots and sizes of the components (roots ascending) ###
+    def component_sizes(self) :
+        roots = numpy.flatnonzero(self.ptr < 0)
+        return [roots, -self.ptr[roots].astype(numpy.int64)]
+
+    ### roots and sizes of the k largest components, largest first ###
+    def largest_components(self, k) :
+        [roots, sizes] = self.component_sizes()
+        if (k < len(roots)) :
+            top = numpy.argpartition(-sizes, k - 1)[:k]
+            roots = roots[top]
+            sizes = sizes[top]
+        order = numpy.lexsort((roots, -sizes))
+        return [roots[order], sizes[order]]
+
+    ### members in CSR form: component c (root roots[c]) holds ###
+    ### nodes[indptr[c]:indptr[c+1]], in ascending order ###
+    def members(self) :
+        labels = self.labels()
+        [roots, sizes] = self.component_sizes()
+        nodes = numpy.argsort(labels, kind='mergesort')
+        indptr = numpy.zeros(len(roots) + 1, dtype=numpy.int64)
+        numpy.cumsum(sizes, out=indptr[1:])
+        return [roots, indptr, nodes]
+
     ### printing ###
     def output(self) :
         print self.ptr
 
+### union find over hashable keys; ids are given in order of arrival; ###
+### ptr is replaced as keys are added, so read it again after add ###
+class KeyedUnionFind(UnionFind) :
+    ### constructor ###
+    def __init__(self, capacity=1024) :
+        self.n = 0
+        self.ids = {} # key -> id
+        self.keys = [] # id -> key
+        self.store = array.array('l', [-1]) * max(capacity, 1)
+        self.view = numpy.frombuffer(self.store, dtype=numpy.int_)
+        self.ptr = self.view[:0]
+        self.edgeBlock = 2**24
+        self.pairBlock = 2**20 # pairs per union_many call in union_pairs
+
+    ### room for size nodes; capacity grows geometrically ###
+    def reserve(self, size) :
+        capacity = len(self.store)
+        if (size <= capacity) :
+            return
+        while (capacity < size) :
+            capacity *= 2
+        # a ptr read before keeps the old store, no longer updated
+        store = array.array('l', [-1]) * capacity
+        store[:len(self.store)] = self.store
+        self.store = store
+        self.view = numpy.frombuffer(self.store, dtype=numpy.int_)
+        self.ptr = self.view[:self.n]
+
+    ### id of key; new keys are added as singletons ###
+    def add(self, key) :
+        i = self.ids.get(key)
+        if (i is None) :
+            i = self.n
+            self.reserve(i + 1)
+            self.ids[key] = i
+            self.keys.append(key)
+            self.n = i + 1
+            self.ptr = self.view[:self.n]
+        return i
+
+    ### ids of the keys (numpy array); new keys are added ###
+    def add_many(self, keys) :
+        ids = self.ids
+        keys = list(keys)
+        out = numpy.zeros(len(keys), dtype=numpy.int64)
+        n = self.n
+        for [o, key] in enumerate(keys) :
+            i = ids.get(key)
+            if (i is None) :
+                i = n
+                ids[key] = i
+                self.keys.append(key)
+                n += 1
+            out[o] = i
+        self.reserve(n)
+        self.n = n
+        self.ptr = self.view[:self.n]
+        return out
+
+    ### root key of key ###
+    def find_key(self, key) :
+        i = self.ids.get(key)
+        if (i is None) :
+            raise LookupError('KeyedUnionFind; unknown key: ' + repr(key))
+        return self.keys[self.find(i)]
+
+    ### union of keys a and b (added if new); returns the root key ###
+    def union_keys(self, a, b) :
+        return self.keys[self.union(self.add(a), self.add(b))]
+
+    ### union of an iterable of (a, b) key pairs, in blocks ###
+    def union_pairs(self, pairs) :
+        block = []
+        for pair in pairs :
+            block.append(pair[0])
+            block.append(pair[1])
+            if (len(block) >= 2 * self.pairBlock) :
+                self.unionBlock(block)
+                block = []
+        if (len(block) > 0) :
+            self.unionBlock(block)
+
+    ### union of the pairs in a flat list [a0, b0, a1, b1, ...] ###
+    def unionBlock(self, block) :
+        ids = self.add_many(block)
+        self.union_many(ids[0::2], ids[1::2])
+
+### union find with aggregates per component; columns is a list of ###
+### [name, kind, values] with kind 'sum', 'min' or 'max' and one value ###
+### per node; the aggregate of a component is kept at its root ###
+class AggregateUnionFind(UnionFind) :
+    ### constructor ###
+    def __init__(self, number_points, columns) :
+        UnionFind.__init__(self, number_points)
+        self.columns = [] # [name, kind, store, view, initial values]
+        self.merge = {'sum' : lambda a, b : a + b, 'min' : min, 'max' : max}
+        for [name, kind, values] in columns :
+            self.add_column(name, kind, values)
+
+    ### declare an aggregate column (before any union) ###
+    def add_column(self, name, kind, values) :
+        if (kind not in self.merge) :
+            raise ValueError('AggregateUnionFind; unknown aggregate: ' + \
+                str(kind))
+        values = numpy.asarray(values)
+        if (len(values) != self.n) :
+            raise ValueError('AggregateUnionFind; column ' + name + \
+                ' has ' + str(len(values)) + ' values, expected ' + str(self.n))
+        if (values.dtype.kind == 'f') :
+            [code, dtype] = ['d', numpy.float]
+        else :
+            [code, dtype] = ['l', numpy.int_]
+        store = array.array(code, [0]) * self.n
+        view = numpy.frombuffer(store, dtype=dtype)
+        initial = values.astype(dtype)
+        view[:] = initial
+        self.columns.append([name, kind, store, view, initial])
+
+    ### reset: singletons with the declared values ###
+    def reset(self) :
+        UnionFind.reset(self)
+        for column in self.columns :
+            column[3][:] = column[4]
+
+    ### union method; the aggregates of the joined roots are merged ###
+    def union(self, i, j) :
+        r1 = self.find(i)
+        r2 = self.find(j)
+        if (r1 == r2) :
+            return r1
+        r = UnionFind.union(self, r1, r2)
+        other = r1 + r2 - r
+        merge = self.merge
+        for [name, kind, store, view, initial] in self.columns :
+            store[r] = merge[kind](store[r], store[other])
+        return r
+
+    ### union of the edges; aggregates reduced over the new components ###
+    def union_many(self, src, dst) :
+        old = numpy.flatnonzero(self.ptr < 0)
+        parent = UnionFind.union_many(self, src, dst)
+        groups = parent[old]
+        reduce = {'sum' : numpy.add, 'min' : numpy.minimum, \
+            'max' : numpy.maximum}
+        for [name, kind, store, view, initial] in self.columns :
+            values = view[old]
+            if (kind == 'sum') :
+                view[groups] = 0
+            else :
+                view[groups] = values # any member's value, then reduced
+            reduce[kind].at(view, groups, values)
+        return parent
+
+    ### aggregate name of the component of node i ###
+    def aggregate(self, name, i) :
+        r = self.find(i)
+        for column in self.columns :
+            if (column[0] == name) :
+                return column[2][r]
+        raise LookupError('AggregateUnionFind; unknown column: ' + name)
+
+    ### all aggregates of the component of node i (with its count) ###
+    def aggregates(self, i) :
+        r = self.find(i)
+        result = {'count' : -self.store[r]}
+        for column in self.columns :
+            result[column[0]] = column[2][r]
+        return result
+
+    ### roots of the components (ascending) and their aggregate name ###
+    def component_aggregates(self, name) :
+        roots = numpy.flatnonzero(self.ptr < 0)
+        for column in self.columns :
+            if (column[0] == name) :
+                return [roots, column[3][roots].copy()]
+        raise LookupError('AggregateUnionFind; unknown column: ' + name)
+
+### union find with an undo log: union by size without path compression ###
+### (trees stay O(log n) high), so every union can be undone in O(1) ###
+class RollbackUnionFind(UnionFind) :
+    ### constructor ###
+    def __init__(self, number_points) :
+        UnionFind.__init__(self, number_points)
+        self.log = array.array('l') # (absorbed root, its old ptr) per union
+        self.count = number_points # number of components
+
+    ### reset ###
+    def reset(self) :
+        UnionFind.reset(self)
+        self.log = array.array('l')
+        self.count = self.n
+
+    ### find method; no path compression ###
+    def find(self, i) :
+        if (i < 0 or i >= self.n) :
+            msg = 'UnionFind(' + str(self.n) + '); index out of bounds: ' + \
+                str(i)
+            raise LookupError(msg)
+        p = self.store
+        j = p[i]
+        while (j >= 0) :
+            i = j
+            j = p[i]
+        return i
+
+    ### union method; logged ###
+    def union(self, i, j) :
+        r1 = self.find(i)
+        r2 = self.find(j)
+        p = self.store
+        if (r1 == r2) :
+            return r1
+        if (p[r1] > p[r2]) :
+            [r1, r2] = [r2, r1]
+        self.log.append(r2)
+        self.log.append(p[r2])
+        p[r1] += p[r2]
+        p[r2] = r1
+        self.count -= 1
+        return r1
+
+    ### union of the edges one by one (every union is logged) ###
+    def union_many(self, src, dst) :
+        src = numpy.asarray(src, dtype=numpy.int64).ravel()
+        dst = numpy.asarray(dst, dtype=numpy.int64).ravel()
+        if (len(src) != len(dst)) :
+            raise ValueError('UnionFind; src and dst differ in length')
+        union = self.union
+        for [i, j] in zip(src.tolist(), dst.tolist()) :
+            union(i, j)
+        return self.labels()
+
+    ### root of every node; the trees are left as they are ###
+    def labels(self) :
+        parent = numpy.array(self.ptr, dtype=numpy.int64)
+        roots = (parent < 0)
+        parent[roots] = numpy.flatnonzero(roots)
+        return compress(parent)
+
+    ### position in the undo log (number of unions so far) ###
+    def checkpoint(self) :
+        return len(self.log) // 2
+
+    ### undo the unions made after checkpoint to ###
+    def rollback(self, to) :
+        if (to < 0 or to > len(self.log) // 2) :
+            raise LookupError('RollbackUnionFind; invalid checkpoint: ' + \
+                str(to))
+        p = self.store
+        log = self.log
+        while (len(log) > 2 * to) :
+            old = log.pop()
+            r2 = log.pop()
+            r1 = p[r2]
+            p[r1] -= old
+            p[r2] = old
+            self.count += 1
+
+### (a, b) key pairs from columns of a csv file ###
+def readPairs(fn, columns=(0, 1), delimiter=',', skip=0) :
+    [ca, cb] = columns
+    f = open(fn, 'rb')
+    try :
+        reader = csv.reader(f, delimiter=delimiter)
+        for [r, row] in enumerate(reader) :
+            if (r < skip) :
+                continue
+            yield (row[ca], row[cb])
+    finally :
+        f.close()
+
+### array of a .npy file, or of a raw file of dtype values reshaped to ###
+### shape (if given), as a read-only memory map ###
+def openArray(fn, dtype, shape=None) :
+    if (fn.endswith('.npy')) :
+        return numpy.load(fn, mmap_mode='r')
+    if (os.path.getsize(fn) == 0) :
+        arr = numpy.zeros(0, dtype=dtype) # cannot be mapped
+    else :
+        arr = numpy.memmap(fn, dtype=dtype, mode='r')
+    if (shape is not None) :
+        arr = arr.reshape(shape)
+    return arr
+
+### pointer jumping until every node points to its root ###
+def compress(parent) :
+    while (True) :
+        grand = parent[parent]
+        if ((grand == parent).all()) :
+            return parent
+        parent = grand
+
+### random unions and finds; seconds per operation ###
+def benchmark(n, ops, block=1000000) :
+    uf = UnionFind(n)
+    rng = numpy.random.RandomState(918273645)
+    elapsed = 0.0
+    done = 0
+    while (done < ops) :
+        m = min(block, ops - done)
+        pairs = rng.randint(0, n, 2 * m).tolist()
+        kinds = (rng.random_sample(m) < 0.5).tolist()
+        find = uf.find
+        union = uf.union
+        start = time.time()
+        for o in xrange(m) :
+            if (kinds[o]) :
+                union(pairs[2 * o], pairs[2 * o + 1])
+            else :
+                find(pairs[2 * o])
+        elapsed += (time.time() - start)
+        done += m
+    return elapsed / ops
+
 ### main ###
-#if __name__ == '__main__':
-#
-#    # check args
-#    args = sys.argv[1:] 
-#    nargs = len(args)
-#    if (nargs < 1) :
-#        print '# usage: union_find.py n'
-#        sys.exit()
-#    
-#    # setup
-#    n = int(args[0])
-#    uf = UnionFind(n)
-#
-#    # find
-#    i = 0
-#    n2 = int(n/2)
-#    while (i < n2) :
-#        j = (n-i-1)
-#        r = uf.union(i, j)
-#        print i, j, r
-#        uf.output()
-#        i += 1
-#
-#    print n2, (n2+1)
-#    uf.union(n2, n2+1)
-#    uf.output()
-#
-#    for i in range(n) :
-#        print i, uf.find(i), uf.root(i)
+if __name__ == '__main__':
+
+    # check args
+    args = sys.argv[1:] 
+    nargs = len(args)
+    if (nargs < 1) :
+        print '# usage: union_find.py n [operations]'
+        sys.exit()
+
+    # setup
+    n = int(args[0])
+    ops = 10**8
+    if (nargs > 1) :
+        ops = int(args[1])
+
+    # benchmark
+    cost = benchmark(n, ops)
+    print '# n = ', n, '; operations = ', ops, '; time per operation = ', \
+        (cost * 1e9), 'ns'